@@ -0,0 +1,93 @@
+import threading
+import time
+
+
+class CostClass:
+    """A group of routes allowed ``max_in_flight`` requests at once in this process.
+
+    Requests past that wait, at most ``max_queued`` of them and for at most
+    ``timeout`` seconds; anything beyond is shed straight away, so an
+    expensive route can't take every thread from the cheap ones.
+    """
+
+    def __init__(self, name, max_in_flight, max_queued, timeout):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self._slots = threading.Semaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.shed_full = 0
+        self.shed_timeout = 0
+        self.peak_queued = 0
+        self.waited = 0.0
+
+    def acquire(self):
+        """Take a slot, waiting in the queue if need be. False means shed the request."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self.queued >= self.max_queued:
+                    self.shed_full += 1
+                    return False
+                self.queued += 1
+                self.peak_queued = max(self.peak_queued, self.queued)
+            start = time.perf_counter()
+            admitted = self._slots.acquire(timeout=self.timeout)
+            with self._lock:
+                self.queued -= 1
+                self.waited += time.perf_counter() - start
+                if not admitted:
+                    self.shed_timeout += 1
+                    return False
+        with self._lock:
+            self.in_flight += 1
+            self.admitted += 1
+        return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_in_flight": self.max_in_flight,
+                "max_queued": self.max_queued,
+                "in_flight": self.in_flight,
+                "queued": self.queued,
+                "peak_queued": self.peak_queued,
+                "admitted": self.admitted,
+                "shed_full": self.shed_full,
+                "shed_timeout": self.shed_timeout,
+                "wait_ms": round(self.waited * 1000, 3),
+            }
+
+
+class AdmissionControl:
+    """Maps endpoints to cost classes; routes with no class are let straight in.
+
+    ``classes`` maps a class name to (max in flight, max queued, timeout)
+    and ``routes`` an endpoint to (class name, methods).
+    """
+
+    def __init__(self):
+        self.configure({}, {})
+
+    def configure(self, classes, routes, enabled=True):
+        self.enabled = enabled
+        self.classes = {name: CostClass(name, *limits) for name, limits in classes.items()}
+        self.routes = {endpoint: (self.classes[name], frozenset(methods))
+                       for endpoint, (name, methods) in routes.items()}
+
+    def class_for(self, endpoint, method):
+        route = self.routes.get(endpoint)
+        if route is None or not self.enabled or method not in route[1]:
+            return None
+        return route[0]
+
+    def stats(self):
+        return {name: cost_class.stats() for name, cost_class in self.classes.items()}
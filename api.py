@@ -0,0 +1,65 @@
+import orjson
+
+from content import reading_minutes
+
+
+# What a client may ask for with fields=, and the post columns each one needs
+POST_FIELDS = {
+    'id': ('id',),
+    'title': ('title',),
+    'slug': ('slug',),
+    'excerpt': ('excerpt',),
+    'body_html': ('body_html',),
+    'date_posted': ('date_posted',),
+    'updated_at': ('updated_at',),
+    'word_count': ('word_count',),
+    'reading_time': ('word_count',),
+    'author': ('post_id',),
+}
+LIST_FIELDS = ('id', 'title', 'slug', 'excerpt', 'date_posted', 'author')
+DETAIL_FIELDS = tuple(POST_FIELDS)
+
+# Always loaded: the cursor is built from date_posted and id, and
+# Last-Modified from updated_at
+KEY_COLUMNS = ('id', 'date_posted', 'updated_at')
+
+
+class BadFields(ValueError):
+    pass
+
+
+def parse_fields(value, default):
+    """Turn ``fields=a,b,c`` into a tuple of field names, ``default`` if empty."""
+    if not value:
+        return default
+    names = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in names if name not in POST_FIELDS]
+    if unknown:
+        raise BadFields("unknown fields: %s" % ', '.join(unknown))
+    return names or default
+
+
+def columns_for(fields):
+    columns = dict.fromkeys(KEY_COLUMNS)
+    for field in fields:
+        columns.update(dict.fromkeys(POST_FIELDS[field]))
+    return tuple(columns)
+
+
+def post_record(post, fields):
+    record = {}
+    for field in fields:
+        if field == 'reading_time':
+            record[field] = reading_minutes(post.word_count)
+        elif field == 'author':
+            poster = post.poster
+            record[field] = None if poster is None else {
+                'id': poster.id, 'username': poster.username, 'name': poster.name}
+        else:
+            record[field] = getattr(post, field)
+    return record
+
+
+def dumps(data):
+    # orjson writes datetimes as RFC 3339 itself and returns bytes ready to send
+    return orjson.dumps(data)
@@ -0,0 +1,144 @@
+import gzip
+import hashlib
+import json
+import os
+
+from images import _write_atomic
+
+try:
+    import brotli
+except ImportError:
+    # Without it assets just don't get a .br copy
+    brotli = None
+
+
+# Where collected assets go, under the static folder
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+
+# Worth compressing; images and fonts are compressed already
+COMPRESSIBLE = {'.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.xml'}
+# Content-Encoding: file suffix, best first
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+HASH_LENGTH = 12
+# A year, the longest max-age caches are asked to honour
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def hashed_name(name, digest):
+    stem, ext = os.path.splitext(name)
+    return '%s.%s%s' % (stem, digest[:HASH_LENGTH], ext)
+
+
+def collect(static_folder, skip=None, gzip_level=9, brotli_quality=11):
+    """Copy static assets into dist/ under content-hashed names.
+
+    Text assets also get .gz and .br copies next to them. Files whose size
+    and mtime match the last manifest aren't read again, and outputs that
+    already exist aren't rewritten. Old hashed copies are left in place for
+    pages still cached somewhere. ``skip(name)`` leaves a file out.
+    Returns (written, unchanged) counts.
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    previous = load_manifest(static_folder)
+    manifest = {}
+    written = unchanged = 0
+
+    for root, dirs, files in os.walk(static_folder):
+        if root == static_folder and DIST_DIR in dirs:
+            dirs.remove(DIST_DIR)
+        for filename in sorted(files):
+            path = os.path.join(root, filename)
+            name = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            if skip is not None and skip(name):
+                continue
+
+            stat = os.stat(path)
+            entry = previous.get(name)
+            if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns \
+                    and _built(dist, entry['hashed'], name):
+                manifest[name] = entry
+                unchanged += 1
+                continue
+
+            with open(path, 'rb') as f:
+                data = f.read()
+            hashed = hashed_name(name, hashlib.sha256(data).hexdigest())
+            target = os.path.join(dist, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            if not os.path.exists(target):
+                _write_atomic(target, lambda f: f.write(data))
+            if _compressible(name):
+                if not os.path.exists(target + '.gz'):
+                    # mtime=0 keeps the output the same for the same input
+                    packed = gzip.compress(data, gzip_level, mtime=0)
+                    _write_atomic(target + '.gz', lambda f: f.write(packed))
+                if brotli is not None and not os.path.exists(target + '.br'):
+                    packed = brotli.compress(data, quality=brotli_quality)
+                    _write_atomic(target + '.br', lambda f: f.write(packed))
+
+            manifest[name] = {'hashed': hashed, 'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+            written += 1
+
+    os.makedirs(dist, exist_ok=True)
+    body = json.dumps(manifest, indent=1, sort_keys=True).encode()
+    _write_atomic(os.path.join(dist, MANIFEST), lambda f: f.write(body))
+    return written, unchanged
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, DIST_DIR, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _compressible(name):
+    return os.path.splitext(name)[1].lower() in COMPRESSIBLE
+
+
+def _built(dist, hashed, name):
+    target = os.path.join(dist, hashed)
+    if not os.path.exists(target):
+        return False
+    if _compressible(name):
+        return os.path.exists(target + '.gz') and (brotli is None or os.path.exists(target + '.br'))
+    return True
+
+
+class AssetManifest:
+    """Maps static file names to their collected, hashed copies.
+
+    Loaded once at start up; with no manifest (nothing collected yet) every
+    name maps to itself and assets are served as before.
+    """
+
+    def __init__(self, static_folder=None):
+        self.names = {}
+        self.hashed = set()
+        if static_folder is not None:
+            self.load(static_folder)
+
+    def load(self, static_folder):
+        self.static_folder = static_folder
+        self.names = {name: '%s/%s' % (DIST_DIR, entry['hashed'])
+                      for name, entry in load_manifest(static_folder).items()}
+        self.hashed = set(self.names.values())
+
+    def url_name(self, name):
+        return self.names.get(name, name)
+
+    def is_hashed(self, name):
+        return name in self.hashed
+
+    def encoding_for(self, name, accept_encodings):
+        """The best precompressed copy of ``name`` the client accepts, as (encoding, file)."""
+        if not _compressible(name):
+            return None, name
+        for encoding, suffix in ENCODINGS:
+            if accept_encodings[encoding] and \
+                    os.path.exists(os.path.join(self.static_folder, name + suffix)):
+                return encoding, name + suffix
+        return None, name
@@ -0,0 +1,97 @@
+"""Weigh the CPU cost of response compression against the bytes it saves.
+
+    python benchmarks/compression_levels.py
+    python benchmarks/compression_levels.py --pages 50 --rounds 5 --file saved_page.html
+
+Compresses synthetic pages shaped like ours (CKEditor HTML from
+benchmarks/dataset.py, and the JSON the API sends) at every gzip level and
+brotli quality, both in one go and chunk by chunk the way streamed pages
+are. Use it to pick COMPRESS_LEVEL and COMPRESS_BROTLI_QUALITY.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import compression
+from dataset import post_html, sentence
+
+# Roughly the size of the pieces a streamed listing is written in
+STREAM_CHUNK = 4096
+
+
+def sample_bodies(pages, seed):
+    rng = random.Random(seed)
+    bodies = {'post page': [], 'api json': []}
+    for _ in range(pages):
+        html = '<html><body><nav>%s</nav>%s</body></html>' % (sentence(rng), post_html(rng, rng.randint(5, 30)))
+        bodies['post page'].append(html.encode())
+        posts = [{'id': i, 'title': sentence(rng, 3, 8), 'slug': 'post-%d' % i,
+                  'excerpt': ' '.join(sentence(rng) for _ in range(4))} for i in range(10)]
+        bodies['api json'].append(json.dumps({'posts': posts}).encode())
+    return bodies
+
+
+def chunks_of(data):
+    return [data[i:i + STREAM_CHUNK] for i in range(0, len(data), STREAM_CHUNK)]
+
+
+def measure(bodies, encoding, level, rounds, streamed):
+    samples = []
+    out = 0
+    for _ in range(rounds):
+        out = 0
+        start = time.perf_counter()
+        for body in bodies:
+            if streamed:
+                out += sum(len(c) for c in compression.compress_stream(chunks_of(body), encoding, level))
+            else:
+                out += len(compression.compress(body, encoding, level))
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=100)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--file', action='append', default=[],
+                        help="also compress this saved response body")
+    args = parser.parse_args()
+
+    bodies = sample_bodies(args.pages, args.seed)
+    for path in args.file:
+        with open(path, 'rb') as f:
+            bodies[os.path.basename(path)] = [f.read()]
+
+    settings = [('gzip', level) for level in range(1, 10)]
+    if compression.brotli is not None:
+        settings += [('br', quality) for quality in range(0, 12)]
+    else:
+        print("brotli is not installed, only timing gzip\n")
+
+    print("%-12s %-8s %8s %12s %10s %9s %10s %12s" % (
+        "body", "setting", "streamed", "us/response", "MB/s", "ratio", "saved KB", "us per KB saved"))
+    for name, group in bodies.items():
+        size = sum(len(body) for body in group)
+        print("%-12s %d responses, %.1f KB each on average" % (name, len(group), size / len(group) / 1024))
+        for encoding, level in settings:
+            for streamed in (False, True):
+                seconds, out = measure(group, encoding, level, args.rounds, streamed)
+                saved = (size - out) / len(group) / 1024
+                per_response = seconds / len(group) * 1e6
+                print("%-12s %-8s %8s %12.1f %10.1f %9.3f %10.1f %12.2f" % (
+                    '', '%s %d' % (encoding, level), 'yes' if streamed else 'no',
+                    per_response, size / seconds / 1e6, out / size, saved,
+                    per_response / saved if saved > 0 else float('nan')))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Seeded synthetic users and posts for benchmarking.
+
+The same seed always produces the same rows, so numbers from two runs are
+comparable. Post bodies look like what CKEditor produces: paragraphs with
+inline formatting, headings, lists, links and the odd quote.
+"""
+import random
+from datetime import datetime, timedelta
+
+
+WORDS = ("flask python blog post database query index cache server worker request "
+         "response template render page user author title content search engine "
+         "the a of and to in is it that for on with as was at by this from or an "
+         "performance latency memory throughput pool thread process sqlite mysql "
+         "migration model view route form session cookie header static image").split()
+
+FIRST_NAMES = ("Ada Alan Barbara Dennis Edsger Frances Grace Guido Ken Linus Margaret "
+               "Niklaus Radia Sophie Tim Yukihiro").split()
+
+# Fixed start so dates don't depend on when the benchmark runs
+EPOCH = datetime(2023, 1, 1)
+
+
+def sentence(rng, low=6, high=18):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(low, high))]
+    return ' '.join(words).capitalize() + '.'
+
+
+def paragraph(rng):
+    parts = []
+    for _ in range(rng.randint(2, 6)):
+        text = sentence(rng)
+        roll = rng.random()
+        if roll < 0.15:
+            word = rng.choice(WORDS)
+            text = text.replace(' %s ' % word, ' <strong>%s</strong> ' % word, 1)
+        elif roll < 0.25:
+            word = rng.choice(WORDS)
+            text = text.replace(' %s ' % word, ' <em>%s</em> ' % word, 1)
+        elif roll < 0.3:
+            text += ' <a href="https://example.com/%s">%s</a>' % (rng.choice(WORDS), rng.choice(WORDS))
+        parts.append(text)
+    return '<p>%s</p>' % ' '.join(parts)
+
+
+def post_html(rng, blocks):
+    html = []
+    for _ in range(blocks):
+        roll = rng.random()
+        if roll < 0.1:
+            html.append('<h2>%s</h2>' % sentence(rng, 2, 5).rstrip('.'))
+        elif roll < 0.2:
+            items = ''.join('<li>%s</li>' % sentence(rng, 3, 8) for _ in range(rng.randint(2, 5)))
+            html.append('<ul>%s</ul>' % items)
+        elif roll < 0.25:
+            html.append('<blockquote><p>%s</p></blockquote>' % sentence(rng))
+        else:
+            html.append(paragraph(rng))
+    return '\n'.join(html)
+
+
+def generate(db, Users, Posts, users=50, posts=1000, seed=1, passwd=None,
+             min_blocks=3, max_blocks=20, batch_size=500):
+    """Add ``users`` users and ``posts`` posts to the database. Returns the new users.
+
+    ``passwd`` is stored as every user's password hash as is, so callers
+    can hash one password once instead of paying for it per user.
+    """
+    rng = random.Random(seed)
+
+    new_users = []
+    for i in range(users):
+        name = '%s %s' % (rng.choice(FIRST_NAMES), rng.choice(FIRST_NAMES))
+        new_users.append(Users(username='bench%d' % i, name=name,
+                               email='bench%d@example.com' % i,
+                               fav_color=rng.choice(('red', 'green', 'blue', 'black')),
+                               about_author=sentence(rng),
+                               passwd=passwd or 'x',
+                               date_added=EPOCH))
+    db.session.add_all(new_users)
+    db.session.commit()
+
+    when = EPOCH
+    for start in range(0, posts, batch_size):
+        batch = []
+        for i in range(start, min(start + batch_size, posts)):
+            when += timedelta(minutes=rng.randint(1, 600))
+            title = sentence(rng, 3, 8).rstrip('.')
+            batch.append(Posts(title=title,
+                               content=post_html(rng, rng.randint(min_blocks, max_blocks)),
+                               slug='%s-%d' % ('-'.join(title.lower().split()[:4]), i),
+                               date_posted=when,
+                               post_id=rng.choice(new_users).id))
+        db.session.add_all(batch)
+        db.session.commit()
+
+    return new_users
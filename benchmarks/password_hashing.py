@@ -0,0 +1,52 @@
+"""Time password hashing at a few PBKDF2 costs.
+
+    python benchmarks/password_hashing.py
+    python benchmarks/password_hashing.py --iterations 260000 600000 --rounds 20
+
+By default it times half, once and twice the configured
+PASSWORD_HASH_ITERATIONS, so you can see what a change in cost would do
+to login latency before making it.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from passwords import PasswordHasher
+
+
+def time_hasher(hasher, rounds):
+    samples = []
+    pwhash = hasher.hash('correct horse battery staple')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        hasher.verify(pwhash, 'correct horse battery staple')
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples
+
+
+def main():
+    configured = int(os.environ.get('PASSWORD_HASH_ITERATIONS', 260000))
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--algorithm', default=os.environ.get('PASSWORD_HASH_ALGORITHM', 'sha256'))
+    parser.add_argument('--iterations', type=int, nargs='+',
+                        default=[configured // 2, configured, configured * 2])
+    parser.add_argument('--rounds', type=int, default=10)
+    args = parser.parse_args()
+
+    print("%-28s %10s %10s %10s" % ("method", "mean ms", "p50 ms", "p95 ms"))
+    for iterations in args.iterations:
+        hasher = PasswordHasher(algorithm=args.algorithm, iterations=iterations,
+                                max_concurrent=1, max_queued=0, timeout=None)
+        samples = time_hasher(hasher, args.rounds)
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        print("%-28s %10.1f %10.1f %10.1f" % (hasher.method, statistics.mean(samples),
+                                               statistics.median(samples), p95))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,380 @@
+"""Drive every route in views.py through the test client and record what each costs.
+
+    python benchmarks/routes.py                       # run, compare with baseline.json
+    python benchmarks/routes.py --save-baseline       # run and make this the new baseline
+    python benchmarks/routes.py --users 200 --posts 20000 --rounds 50 --only posts search
+    python benchmarks/routes.py --explain             # check every query plan instead
+
+For each scenario it reports p50/p95/p99 latency, SQL statements per
+request and peak Python memory for one request, and diffs them against
+benchmarks/baseline.json. Runs against a throwaway SQLite file filled by
+dataset.py, so only compare baselines made with the same dataset options.
+
+With --explain nothing is timed: each scenario runs once while
+query_audit.py records its SQL, then every distinct statement goes through
+EXPLAIN QUERY PLAN and any full table scan, index scan without a LIMIT or
+temp B-tree sort fails the run.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+PASSWORD = 'benchmark'
+
+# Statements allowed to scan or sort without an index, as regexes
+EXPLAIN_ALLOW = (
+    # Search results are ranked by bm25 over the matches, there's no index for that
+    r'\bposts_fts MATCH\b.*ORDER BY bm25',
+)
+
+
+class Scenario:
+    """One request to time.
+
+    ``url`` may be a callable taking the Bench and returning the url, for
+    requests that need something created first (that part isn't timed).
+    ``as_user`` picks the client: 'admin', 'author', None for signed out,
+    or 'fresh' for a new user signed in just for this request.
+    """
+
+    def __init__(self, name, endpoint, url, method='GET', data=None, as_user='admin'):
+        self.name = name
+        self.endpoint = endpoint
+        self.url = url
+        self.method = method
+        self.data = data
+        self.as_user = as_user
+
+
+def scenarios():
+    return [
+        Scenario('index', 'index', '/'),
+        Scenario('admin', 'admin', '/admin'),
+        Scenario('admin_metrics', 'admin_metrics', '/admin/metrics'),
+        Scenario('admin_profile', 'admin_profile', '/admin/profile'),
+        Scenario('user', 'user', '/user/bench1'),
+        Scenario('me', 'me', '/me'),
+        Scenario('date', 'get_current_date', '/date', as_user=None),
+        Scenario('login_form', 'login', '/login', as_user=None),
+        Scenario('login', 'login', '/login', 'POST',
+                 lambda b: {'username': 'bench1', 'passwd': PASSWORD}, as_user=None),
+        Scenario('logout', 'logout', '/logout', as_user='fresh'),
+        Scenario('dashboard', 'dashboard', '/dashboard'),
+        Scenario('dashboard_update', 'dashboard', '/dashboard', 'POST',
+                 lambda b: {'name': 'Bench Admin', 'email': 'bench0@example.com', 'fav_color': 'red',
+                            'username': 'bench0', 'about_author': 'Benchmarks things',
+                            'profile_pic': (b.empty_file(), '')}),
+        Scenario('add_user_form', 'add_user', '/user/add', as_user=None),
+        Scenario('add_user', 'add_user', '/user/add', 'POST', lambda b: b.new_user_form(), as_user=None),
+        Scenario('test_pw', 'test_pw', '/test_pw', 'POST',
+                 lambda b: {'email': 'bench1@example.com', 'passwd': PASSWORD}, as_user=None),
+        Scenario('update_form', 'update', lambda b: '/update/%d' % b.author_id),
+        Scenario('delete_user', 'delete', lambda b: '/delete/%d' % b.fresh_user_id, as_user='fresh'),
+        Scenario('add_post_form', 'add_post', '/add_post', as_user='author'),
+        Scenario('add_post', 'add_post', '/add_post', 'POST',
+                 lambda b: {'title': 'Benchmark post', 'content': b.sample_html, 'slug': 'benchmark-post'},
+                 as_user='author'),
+        Scenario('posts', 'posts', '/posts'),
+        Scenario('posts_deep_page', 'posts', lambda b: b.deep_page_url),
+        Scenario('post', 'post', lambda b: '/posts/%s' % b.some_post_slug),
+        Scenario('post_cold', 'post', lambda b: b.cold_post_url()),
+        Scenario('post_by_id', 'post_by_id', lambda b: '/posts/%d' % b.some_post_id),
+        Scenario('feed', 'feed', '/feed.atom', as_user=None),
+        Scenario('api_posts', 'api_posts', '/api/posts?fields=id,title,slug,excerpt'),
+        Scenario('api_post', 'api_post', lambda b: '/api/posts/%d' % b.some_post_id),
+        Scenario('edit_post_form', 'edit_post', lambda b: '/posts/edit/%d' % b.some_post_id),
+        Scenario('delete_post', 'delete_post', lambda b: '/posts/delete/%d' % b.throwaway_post_id()),
+        Scenario('search', 'search', '/search?q=database+index'),
+        Scenario('search_page_3', 'search', '/search?q=flask&page=3'),
+    ]
+
+
+class Bench:
+
+    def __init__(self, app, models, args):
+        # models.py also brings db, password_hasher and search_index along
+        self.m = models
+        self.app = app
+        self.db = models.db
+        self.args = args
+        self.statements = 0
+        self.counter = 0
+
+        from sqlalchemy import event
+        with self.app.app_context():
+            event.listen(self.db.engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.statements += 1
+
+    def seed(self):
+        import dataset
+        m = self.m
+        with self.app.app_context():
+            m.db.create_all()
+            passwd = m.password_hasher.hash(PASSWORD)
+            users = dataset.generate(m.db, m.Users, m.Posts, users=self.args.users,
+                                     posts=self.args.posts, seed=self.args.seed, passwd=passwd)
+            m.search_index.rebuild(m.db.session)
+            m.Users.recount_posts()
+            m.db.session.commit()
+
+            self.admin_id = users[0].id
+            self.author_id = users[1].id
+            post = m.Posts.query.filter_by(post_id=self.author_id).first()
+            self.some_post_id = post.id
+            self.some_post_slug = post.slug
+            self.sample_html = post.content
+            self.post_slugs = [slug for (slug,) in m.db.session.query(m.Posts.slug)]
+
+        self.clients = {None: self.app.test_client(),
+                        'admin': self.login('bench0'),
+                        'author': self.login('bench1')}
+        self.deep_page_url = self.page_url(depth=min(50, self.args.posts // 20))
+
+    def login(self, username):
+        client = self.app.test_client()
+        response = client.post('/login', data={'username': username, 'passwd': PASSWORD})
+        assert response.status_code == 302, "could not log in as %s" % username
+        # Swallow the "Logged In" flash so it doesn't land on a timed page
+        client.get('/dashboard')
+        return client
+
+    def page_url(self, depth):
+        import re
+        url = '/posts'
+        for _ in range(depth):
+            html = self.clients['admin'].get(url).get_data(as_text=True)
+            found = re.search(r'href="([^"]*after=[^"]*)"', html)
+            if not found:
+                break
+            url = found.group(1).replace('&amp;', '&')
+        return url
+
+    # Helpers for scenarios that need fresh rows
+
+    def unique(self):
+        self.counter += 1
+        return '%d%d' % (os.getpid(), self.counter)
+
+    def new_user_form(self):
+        n = self.unique()
+        return {'name': 'New %s' % n, 'username': 'new%s' % n, 'email': 'new%s@example.com' % n,
+                'fav_color': '', 'passwd': PASSWORD, 'passwd2': PASSWORD}
+
+    def make_user(self):
+        m = self.m
+        n = self.unique()
+        with self.app.app_context():
+            user = m.Users(username='fresh%s' % n, name='Fresh %s' % n,
+                           email='fresh%s@example.com' % n,
+                           passwd=m.password_hasher.hash(PASSWORD))
+            m.db.session.add(user)
+            m.db.session.commit()
+            return user.id, user.username
+
+    def throwaway_post_id(self):
+        m = self.m
+        with self.app.app_context():
+            post = m.Posts(title='Throwaway', content=self.sample_html,
+                           slug=m.Posts.free_slug('throwaway'), post_id=self.admin_id)
+            m.db.session.add(post)
+            m.db.session.flush()
+            m.search_index.index_post(m.db.session, post)
+            m.db.session.commit()
+            return post.id
+
+    def cold_post_url(self):
+        # A different post each time, so the page cache can't answer
+        self.cold_index = (getattr(self, 'cold_index', 0) + 1) % len(self.post_slugs)
+        return '/posts/%s' % self.post_slugs[self.cold_index]
+
+    def empty_file(self):
+        import io
+        return io.BytesIO(b'')
+
+    # Running
+
+    def prepare(self, scenario):
+        """Everything a request needs that shouldn't count towards its time."""
+        if scenario.as_user == 'fresh':
+            self.fresh_user_id, username = self.make_user()
+            client = self.login(username)
+        else:
+            client = self.clients[scenario.as_user]
+        url = scenario.url(self) if callable(scenario.url) else scenario.url
+        data = scenario.data(self) if callable(scenario.data) else scenario.data
+        return client, url, data
+
+    def request(self, client, scenario, url, data):
+        response = client.open(url, method=scenario.method, data=data)
+        if response.status_code >= 500:
+            raise RuntimeError("%s answered %d" % (scenario.name, response.status_code))
+        response.get_data()
+        response.close()
+
+    def explain(self, scenario, audit):
+        client, url, data = self.prepare(scenario)
+        audit.label = scenario.name
+        with audit:
+            self.request(client, scenario, url, data)
+
+    def run(self, scenario):
+        for _ in range(self.args.warmup):
+            client, url, data = self.prepare(scenario)
+            self.request(client, scenario, url, data)
+
+        timings = []
+        statements = 0
+        for _ in range(self.args.rounds):
+            client, url, data = self.prepare(scenario)
+            self.statements = 0
+            start = time.perf_counter()
+            self.request(client, scenario, url, data)
+            timings.append((time.perf_counter() - start) * 1000)
+            statements += self.statements
+
+        # tracemalloc slows everything down, so memory gets a round of its own
+        client, url, data = self.prepare(scenario)
+        tracemalloc.start()
+        self.request(client, scenario, url, data)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        timings.sort()
+        return {
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'queries': round(statements / len(timings), 2),
+            'peak_kb': round(peak / 1024, 1),
+        }
+
+
+def percentile(values, pct):
+    index = min(len(values) - 1, max(0, int(round(pct / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def compare(results, baseline, threshold):
+    """Print results next to the baseline. Returns the names that got worse."""
+    regressions = []
+    print("%-18s %10s %10s %10s %8s %10s  %s" % ("scenario", "p50 ms", "p95 ms", "p99 ms",
+                                                 "queries", "peak KB", "vs baseline"))
+    for name, row in results.items():
+        old = baseline.get(name)
+        notes = []
+        if old:
+            for key in ('p50_ms', 'p95_ms', 'peak_kb'):
+                if old[key] and row[key] > old[key] * (1 + threshold):
+                    notes.append("%s +%d%%" % (key, (row[key] / old[key] - 1) * 100))
+            if row['queries'] > old['queries']:
+                notes.append("queries %g -> %g" % (old['queries'], row['queries']))
+            if notes:
+                regressions.append(name)
+        elif baseline:
+            notes.append("new")
+        print("%-18s %10.2f %10.2f %10.2f %8g %10.1f  %s" % (name, row['p50_ms'], row['p95_ms'],
+                                                            row['p99_ms'], row['queries'],
+                                                            row['peak_kb'], ', '.join(notes)))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--posts', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--only', nargs='+', metavar='SCENARIO')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="slowdown that counts as a regression, 0.2 = 20%%")
+    parser.add_argument('--output', help="also write the results to this JSON file")
+    parser.add_argument('--explain', action='store_true',
+                        help="check the query plan of every statement instead of timing")
+    args = parser.parse_args()
+
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    os.environ['APP_CONFIG'] = 'testing'
+    os.environ['TEST_DATABASE_URL'] = 'sqlite:///' + db_path
+    # Relative paths in the app (uploads, templates) are from the repo root
+    os.chdir(ROOT)
+
+    try:
+        # Imported only now, config.py reads the environment set above
+        from app import create_app
+        import models
+
+        bench = Bench(create_app(), models, args)
+        bench.seed()
+
+        all_scenarios = scenarios()
+        covered = {s.endpoint for s in all_scenarios}
+        # Scenarios name the view, without the blueprint in front
+        missing = sorted(rule.endpoint for rule in bench.app.url_map.iter_rules()
+                         if rule.endpoint.rsplit('.', 1)[-1] not in covered | {'static'})
+        if missing:
+            print("No scenario for: %s" % ', '.join(missing))
+
+        selected = [s for s in all_scenarios if not args.only or s.name in args.only]
+        if args.explain:
+            from query_audit import QueryAudit
+            with bench.app.app_context():
+                audit = QueryAudit(bench.db.engine)
+                for scenario in selected:
+                    bench.explain(scenario, audit)
+                findings = audit.findings()
+                problems = audit.problems(EXPLAIN_ALLOW)
+        else:
+            results = {scenario.name: bench.run(scenario) for scenario in selected}
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db_path + suffix):
+                os.unlink(db_path + suffix)
+
+    if args.explain:
+        for finding in findings:
+            print(finding)
+        print("%d statements explained, %d scan or sort without an index"
+              % (len(findings), len(problems)))
+        if problems:
+            print("Not indexed:\n%s" % '\n'.join(str(p) for p in problems))
+            sys.exit(1)
+        return
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+
+    regressions = compare(results, baseline, args.threshold)
+
+    document = {'dataset': {'users': args.users, 'posts': args.posts, 'seed': args.seed},
+                'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+        print("Saved baseline to %s" % args.baseline)
+    elif regressions:
+        print("Slower than baseline: %s" % ', '.join(regressions))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Show how long readers wait while another connection is writing to SQLite.
+
+    python benchmarks/sqlite_concurrency.py
+    python benchmarks/sqlite_concurrency.py --readers 8 --hold 0.5
+
+A writer opens a transaction, updates every post and holds its lock for
+--hold seconds while reader threads keep selecting from the same table.
+It runs once with the old rollback journal and once with the pragmas from
+config.py; under WAL the readers' worst case should stay in milliseconds
+instead of growing to the length of the write.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config, sqlite_pragmas
+
+
+def connect(path, pragmas):
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    for name, value in pragmas.items():
+        conn.execute('PRAGMA %s = %s' % (name, value))
+    return conn
+
+
+def run(pragmas, readers, hold, rows):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        setup = connect(path, pragmas)
+        setup.execute("CREATE TABLE posts (id INTEGER PRIMARY KEY, title TEXT, content TEXT)")
+        setup.executemany("INSERT INTO posts (title, content) VALUES (?, ?)",
+                          [("Post %d" % i, "x" * 500) for i in range(rows)])
+        setup.close()
+
+        writing = threading.Event()
+        done = threading.Event()
+        waits = []
+        lock = threading.Lock()
+
+        def writer():
+            conn = connect(path, pragmas)
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("UPDATE posts SET title = title || '!'")
+            # Without WAL a write this size ends up holding the lock that
+            # shuts readers out until COMMIT
+            writing.set()
+            time.sleep(hold)
+            conn.execute("COMMIT")
+            conn.close()
+            done.set()
+
+        def reader():
+            conn = connect(path, pragmas)
+            writing.wait()
+            while not done.is_set():
+                start = time.perf_counter()
+                conn.execute("SELECT count(*), max(length(content)) FROM posts").fetchone()
+                with lock:
+                    waits.append(time.perf_counter() - start)
+            conn.close()
+
+        threads = [threading.Thread(target=reader) for _ in range(readers)]
+        for t in threads:
+            t.start()
+        writer()
+        for t in threads:
+            t.join()
+        waits.sort()
+        return len(waits), waits[len(waits) // 2] * 1000, waits[-1] * 1000
+    finally:
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(path + suffix):
+                os.unlink(path + suffix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--hold', type=float, default=0.3, help="seconds the writer holds its lock")
+    parser.add_argument('--rows', type=int, default=5000)
+    args = parser.parse_args()
+
+    profiles = [
+        ("rollback journal", {'journal_mode': 'DELETE', 'synchronous': 'FULL'}),
+        ("config.py pragmas", sqlite_pragmas(vars(Config))),
+    ]
+    print("%-20s %8s %12s %12s" % ("profile", "reads", "p50 ms", "max ms"))
+    for label, pragmas in profiles:
+        reads, p50, worst = run(pragmas, args.readers, args.hold, args.rows)
+        print("%-20s %8d %12.2f %12.2f" % (label, reads, p50, worst))
+
+
+if __name__ == '__main__':
+    main()
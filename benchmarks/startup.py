@@ -0,0 +1,62 @@
+"""Time a cold start: importing the app, building it and serving a first request.
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 20
+
+Each run is a fresh interpreter, the way a worker boots. It reports the
+time to import app.py, to call create_app() and to answer a first request
+to /date, plus how many modules were loaded by then. On a tree from before
+the application factory, everything happens during the import.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r'''
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+modules = len(sys.modules)
+application = app.create_app() if hasattr(app, 'create_app') else app.app
+created = time.perf_counter()
+application.test_client().get('/date')
+served = time.perf_counter()
+print(json.dumps({'import_ms': (imported - start) * 1000,
+                  'create_ms': (created - imported) * 1000,
+                  'first_request_ms': (served - created) * 1000,
+                  'total_ms': (served - start) * 1000,
+                  'modules_after_import': modules,
+                  'modules_after_request': len(sys.modules)}))
+'''
+
+
+def run_once():
+    env = dict(os.environ, APP_CONFIG=os.environ.get('APP_CONFIG', 'testing'))
+    out = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    # The first run pays for writing .pyc files, leave it out
+    run_once()
+    runs = [run_once() for _ in range(args.runs)]
+
+    print("%-22s %10s %10s %10s" % ("", "median", "min", "max"))
+    for key in runs[0]:
+        values = [run[key] for run in runs]
+        print("%-22s %10.1f %10.1f %10.1f" % (key, statistics.median(values), min(values), max(values)))
+
+
+if __name__ == '__main__':
+    main()
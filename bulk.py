@@ -0,0 +1,163 @@
+import csv
+import json
+from datetime import datetime
+from itertools import islice
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import DBAPIError
+
+
+# Columns that go in and out of each table. Derived post columns
+# (body_html, excerpt, word_count) are worked out again on import.
+USER_FIELDS = ('id', 'username', 'name', 'email', 'fav_color', 'about_author',
+               'date_added', 'passwd', 'profile_pic')
+POST_FIELDS = ('id', 'title', 'slug', 'content', 'date_posted', 'post_id')
+
+REQUIRED = {
+    'users': ('username', 'name', 'passwd'),
+    'posts': ('title',),
+}
+DATE_FIELDS = ('date_added', 'date_posted')
+INT_FIELDS = ('id', 'post_id')
+
+
+class BadRecord(Exception):
+
+    def __init__(self, number, message):
+        super().__init__("record %d: %s" % (number, message))
+        self.number = number
+        # Records up to here were committed, pass it back as the offset
+        self.resume_at = None
+
+
+def read_records(stream, fmt):
+    """Yield dicts from a JSONL or CSV text stream, one line at a time.
+
+    A line that can't be parsed raises BadRecord numbered like the records
+    around it, so the import can say where to resume.
+    """
+    # Records read so far; whatever fails is the one after
+    number = 0
+    try:
+        if fmt == 'csv':
+            for row in csv.DictReader(stream):
+                number += 1
+                yield row
+        else:
+            for line in stream:
+                line = line.strip()
+                if line:
+                    record = json.loads(line)
+                    number += 1
+                    yield record
+    except (ValueError, csv.Error) as e:
+        raise BadRecord(number + 1, "can't be read: %s" % e)
+
+
+def clean_record(number, record, fields, required):
+    row = {}
+    for field in fields:
+        value = record.get(field)
+        if value == '' or value is None:
+            continue
+        if field in DATE_FIELDS and isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        elif field in INT_FIELDS:
+            value = int(value)
+        row[field] = value
+    for field in required:
+        if field not in row:
+            raise BadRecord(number, "missing %s" % field)
+    return row
+
+
+def import_records(session, table, records, fields, required, batch_size=1000, offset=0,
+                   prepare=None, prepare_batch=None, progress=None):
+    """Insert records in batches of ``batch_size`` with one executemany each.
+
+    The first ``offset`` records are skipped, so an import that stopped
+    part way can carry on from the last count ``progress`` reported. Each
+    batch is committed on its own. ``prepare`` gets each row as it is read,
+    ``prepare_batch`` the list of a batch's rows just before they go in.
+    Returns the number of the last record imported.
+    """
+    number = offset
+    committed = offset
+    batch = []
+    statement = insert(table)
+
+    def flush():
+        nonlocal committed
+        if prepare_batch is not None:
+            prepare_batch(batch)
+        # executemany needs the same columns in every row, so rows missing
+        # optional fields (and falling back to column defaults) go separately
+        groups = {}
+        for row in batch:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+        try:
+            for rows in groups.values():
+                session.execute(statement, rows)
+            session.commit()
+        except DBAPIError as e:
+            # A duplicate username or slug and the like: the whole batch is
+            # undone, so resuming starts again from its first record
+            session.rollback()
+            raise BadRecord(committed + 1, "batch ending at record %d was refused: %s"
+                            % (number, e.orig))
+        committed = number
+        batch.clear()
+        if progress is not None:
+            progress(number)
+
+    try:
+        for record in islice(records, offset, None):
+            number += 1
+            try:
+                row = clean_record(number, record, fields, required)
+            except (ValueError, TypeError, AttributeError) as e:
+                raise BadRecord(number, e)
+            if prepare is not None:
+                row = prepare(row)
+            batch.append(row)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    except BadRecord as e:
+        e.resume_at = committed
+        raise
+    return number
+
+
+def export_records(session, table, fields, stream, fmt, chunk_size=1000):
+    """Write every row of ``table`` to ``stream``, reading ``chunk_size`` rows at a time.
+
+    Rows are streamed from the database cursor (server side where the
+    driver supports it) and written as they arrive, so memory use doesn't
+    grow with the size of the table. Returns the number of rows written.
+    """
+    columns = [table.c[field] for field in fields]
+    query = select(*columns).order_by(table.c.id) \
+        .execution_options(yield_per=chunk_size, stream_results=True)
+
+    writer = None
+    if fmt == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=fields)
+        writer.writeheader()
+
+    count = 0
+    for row in session.execute(query):
+        record = {field: _dump(value) for field, value in zip(fields, row)}
+        if writer is not None:
+            writer.writerow(record)
+        else:
+            stream.write(json.dumps(record) + '\n')
+        count += 1
+    return count
+
+
+def _dump(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
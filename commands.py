@@ -0,0 +1,180 @@
+import os
+import sys
+from collections import Counter
+
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+from sqlalchemy import func, or_
+
+from content import derive_post_fields
+from slugs import slugify, unique_slug
+import search_index
+import bulk
+from assets import collect
+from images import make_thumbnails, is_upload
+from extensions import db
+from models import Users, Posts
+
+
+# Fingerprint and precompress the static files. Uploads are left out, they
+# arrive after the build and already have names that change with the content
+@click.command('collect-static')
+@with_appcontext
+def collect_static():
+    upload_dir = os.path.relpath(current_app.config['UPLOAD_FOLDER'], 'static').replace(os.sep, '/') + '/'
+    written, unchanged = collect(current_app.static_folder,
+                                 skip=lambda name: name.startswith(upload_dir) and is_upload(name))
+    print("Collected %d files, %d unchanged" % (written, unchanged))
+
+
+# Make any thumbnails missing for the profile pictures in use
+@click.command('rebuild-thumbnails')
+@with_appcontext
+def rebuild_thumbnails():
+    names = [name for (name,) in db.session.query(Users.profile_pic).distinct() if name]
+    made = 0
+    for name in names:
+        try:
+            made += make_thumbnails(current_app.config['UPLOAD_FOLDER'], name)
+        except Exception as e:
+            print("Skipped %s: %s" % (name, e))
+    print("Checked %d pictures, resized %d" % (len(names), made))
+
+
+# Rebuild the search index from the posts table
+@click.command('rebuild-search-index')
+@with_appcontext
+def rebuild_search_index():
+    count = search_index.rebuild(db.session)
+    db.session.commit()
+    print("Indexed %d posts" % count)
+
+
+# Bulk import and export, e.g. flask posts import old_blog.jsonl --batch-size 5000
+users_cli = AppGroup('users', help="Import and export users as JSONL or CSV.")
+posts_cli = AppGroup('posts', help="Import and export posts as JSONL or CSV.")
+
+
+def open_stream(path, mode):
+    if path == '-':
+        return sys.stdin if mode == 'r' else sys.stdout
+    # newline='' so csv keeps line breaks inside post bodies intact
+    return open(path, mode, newline='', encoding='utf-8')
+
+
+def stream_format(path, fmt):
+    return fmt or ('csv' if path.endswith('.csv') else 'jsonl')
+
+
+def import_options(command):
+    command = click.option('--offset', default=0,
+                           help="Skip this many records, to resume an import that stopped.")(command)
+    command = click.option('--batch-size', default=1000, help="Records per INSERT and commit.")(command)
+    command = click.option('--format', 'fmt', type=click.Choice(['jsonl', 'csv']),
+                           help="Defaults to csv for .csv files, jsonl otherwise.")(command)
+    return click.argument('path')(command)
+
+
+def export_options(command):
+    command = click.option('--chunk-size', default=1000, help="Rows fetched from the cursor at a time.")(command)
+    command = click.option('--format', 'fmt', type=click.Choice(['jsonl', 'csv']),
+                           help="Defaults to csv for .csv files, jsonl otherwise.")(command)
+    return click.argument('path', default='-')(command)
+
+
+def run_import(table, fields, path, fmt, batch_size, offset, prepare=None, prepare_batch=None):
+    stream = open_stream(path, 'r')
+    try:
+        records = bulk.read_records(stream, stream_format(path, fmt))
+        return bulk.import_records(db.session, table, records, fields,
+                                   bulk.REQUIRED[table.name], batch_size=batch_size,
+                                   offset=offset, prepare=prepare, prepare_batch=prepare_batch,
+                                   progress=lambda n: click.echo("%d records imported" % n, err=True))
+    except bulk.BadRecord as e:
+        db.session.rollback()
+        raise click.ClickException("%s (fix it and resume with --offset %d)" % (e, e.resume_at))
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def run_export(table, fields, path, fmt, chunk_size):
+    stream = open_stream(path, 'w')
+    try:
+        count = bulk.export_records(db.session, table, fields, stream,
+                                    stream_format(path, fmt), chunk_size=chunk_size)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+    click.echo("%d records exported" % count, err=True)
+
+
+@users_cli.command('import')
+@import_options
+def import_users(path, fmt, batch_size, offset):
+    run_import(Users.__table__, bulk.USER_FIELDS, path, fmt, batch_size, offset)
+
+
+@users_cli.command('export')
+@export_options
+def export_users(path, fmt, chunk_size):
+    run_export(Users.__table__, bulk.USER_FIELDS, path, fmt, chunk_size)
+
+
+@posts_cli.command('import')
+@import_options
+def import_posts(path, fmt, batch_size, offset):
+    last_id = db.session.query(func.max(Posts.id)).scalar() or 0
+    explicit_ids = []
+    authors = set()
+
+    # Rows go straight to the table, so work out what Posts.validate_content
+    # and add_post would
+    def prepare(row):
+        row.update(derive_post_fields(row.get('content')))
+        if 'id' in row:
+            explicit_ids.append(row['id'])
+        if row.get('post_id') is not None:
+            authors.add(row['post_id'])
+        return row
+
+    # Slugs are looked up a batch at a time: one query for the slugs as
+    # given, and one more for their numbered forms if any of them clash.
+    # Earlier batches are committed by now, so the table knows their slugs
+    def prepare_batch(rows):
+        bases = [slugify(row.get('slug')) or slugify(row['title']) or 'post' for row in rows]
+        taken = {slug for (slug,) in db.session.query(Posts.slug).filter(Posts.slug.in_(set(bases)))}
+        clashing = {base for base, count in Counter(bases).items() if count > 1 or base in taken}
+        if clashing:
+            # "<base>-<n>" sorts between "<base>-" and "<base>.", an index range each
+            numbered = or_(*[Posts.slug.between(base + '-', base + '.') for base in clashing])
+            taken.update(slug for (slug,) in db.session.query(Posts.slug).filter(numbered))
+        for row, base in zip(rows, bases):
+            row['slug'] = unique_slug(base, taken.__contains__)
+            taken.add(row['slug'])
+
+    try:
+        run_import(Posts.__table__, bulk.POST_FIELDS, path, fmt, batch_size, offset, prepare,
+                   prepare_batch)
+    finally:
+        # Index whatever got committed, even if a bad record stopped the import.
+        # Ids from the file may land anywhere, otherwise new ones follow last_id
+        if explicit_ids:
+            indexed = search_index.rebuild(db.session)
+        else:
+            indexed = search_index.index_after(db.session, last_id)
+        Users.recount_posts(authors)
+        db.session.commit()
+        click.echo("%d posts added to the search index" % indexed, err=True)
+
+
+@posts_cli.command('export')
+@export_options
+def export_posts(path, fmt, chunk_size):
+    run_export(Posts.__table__, bulk.POST_FIELDS, path, fmt, chunk_size)
+
+
+def init_app(app):
+    for command in (collect_static, rebuild_thumbnails, rebuild_search_index, users_cli, posts_cli):
+        app.cli.add_command(command)
@@ -0,0 +1,89 @@
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    # Without it responses are only ever gzipped
+    brotli = None
+
+
+# gzip wrapper around deflate, what zlib wants for wbits
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def choose_encoding(accept_encodings):
+    """The encoding to use for a client's Accept-Encoding, or None for none."""
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_stream(chunks, encoding, level):
+    """Compress an iterable of bytes as it goes.
+
+    Every chunk is flushed through on its own, so a streamed page still
+    reaches the client piece by piece instead of after the whole body.
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=level)
+        for chunk in chunks:
+            if chunk:
+                yield compressor.process(chunk) + compressor.flush()
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+        for chunk in chunks:
+            if chunk:
+                yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+
+
+def compress_response(response, accept_encodings, mimetypes, min_size, gzip_level, brotli_quality):
+    """Compress a Flask response in place when it and the client allow it."""
+    if response.mimetype not in mimetypes:
+        return response
+    # Whatever else happens, a cache must not mix up the encoded and plain versions
+    response.vary.add('Accept-Encoding')
+
+    if response.status_code < 200 or response.status_code in (204, 304) \
+            or 'Content-Encoding' in response.headers or response.direct_passthrough:
+        return response
+    encoding = choose_encoding(accept_encodings)
+    if encoding is None:
+        return response
+    level = brotli_quality if encoding == 'br' else gzip_level
+
+    if response.is_streamed:
+        original = response.response
+        encoded = response.iter_encoded()
+
+        def body():
+            try:
+                yield from compress_stream(encoded, encoding, level)
+            finally:
+                if hasattr(original, 'close'):
+                    original.close()
+
+        response.response = body()
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        response.set_data(compress(data, encoding, level))
+
+    response.content_encoding = encoding
+    # The bytes differ per encoding now, only a weak match still holds
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
@@ -0,0 +1,150 @@
+from html import escape
+from html.parser import HTMLParser
+
+
+# Tags whose text should never end up in the plain-text version of a post
+SKIP_TAGS = {'script', 'style'}
+# Block level tags that should be separated by whitespace once stripped
+BLOCK_TAGS = {'p', 'div', 'br', 'li', 'ul', 'ol', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+              'blockquote', 'pre', 'table', 'tr', 'td', 'th', 'hr', 'figure'}
+
+
+class _TextExtractor(HTMLParser):
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skipping += 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append(' ')
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self.skipping = max(self.skipping - 1, 0)
+        elif tag in BLOCK_TAGS:
+            self.parts.append(' ')
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.parts.append(data)
+
+
+# Turn the CKEditor HTML of a post into plain text
+def html_to_text(html):
+    if not html:
+        return ''
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    return ' '.join(''.join(parser.parts).split())
+
+
+# Tags and attributes CKEditor produces that are safe to render back out
+ALLOWED_TAGS = {'a', 'abbr', 'b', 'blockquote', 'br', 'caption', 'code', 'del', 'div', 'em',
+                'figcaption', 'figure', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'img',
+                'li', 'ol', 'p', 'pre', 's', 'span', 'strike', 'strong', 'sub', 'sup', 'table',
+                'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'u', 'ul'}
+ALLOWED_ATTRS = {'a': {'href', 'title'},
+                 'img': {'src', 'alt', 'title', 'width', 'height'},
+                 'td': {'colspan', 'rowspan'},
+                 'th': {'colspan', 'rowspan'}}
+URL_ATTRS = {'href', 'src'}
+SAFE_SCHEMES = ('http:', 'https:', 'mailto:')
+VOID_TAGS = {'br', 'hr', 'img'}
+
+# Roughly how many characters of plain text a listing shows per post
+EXCERPT_LENGTH = 300
+# Average adult reading speed, used for the "x min read" estimate
+WORDS_PER_MINUTE = 200
+
+
+def _safe_url(url):
+    url = ''.join(url.split()).lower()
+    # Relative links are fine, anything with a scheme must be on the list
+    return ':' not in url.split('/', 1)[0] or url.startswith(SAFE_SCHEMES)
+
+
+class _Sanitizer(HTMLParser):
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out = []
+        self.open_tags = []
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skipping += 1
+            return
+        if self.skipping or tag not in ALLOWED_TAGS:
+            return
+        allowed = ALLOWED_ATTRS.get(tag, set())
+        kept = ''
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name in URL_ATTRS and not _safe_url(value):
+                continue
+            kept += ' %s="%s"' % (name, escape(value, quote=True))
+        self.out.append('<%s%s>' % (tag, kept))
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag in SKIP_TAGS:
+            self.skipping = max(self.skipping - 1, 0)
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self.skipping = max(self.skipping - 1, 0)
+            return
+        if self.skipping or tag not in self.open_tags:
+            return
+        # Close anything left open inside this tag so the output stays balanced
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.out.append('</%s>' % open_tag)
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.out.append(escape(data, quote=False))
+
+
+# Strip everything but a known set of tags and attributes from post HTML
+def sanitize_html(html):
+    if not html:
+        return ''
+    parser = _Sanitizer()
+    parser.feed(html)
+    parser.close()
+    parser.out.extend('</%s>' % tag for tag in reversed(parser.open_tags))
+    return ''.join(parser.out)
+
+
+# Cut plain text down to length at a word boundary
+def make_excerpt(text, length=EXCERPT_LENGTH):
+    if len(text) <= length:
+        return text
+    cut = text[:length].rsplit(' ', 1)[0]
+    return cut.rstrip('.,;:!? ') + '...'
+
+
+def reading_minutes(word_count):
+    return max(1, round((word_count or 0) / WORDS_PER_MINUTE))
+
+
+# Everything a post stores alongside its raw HTML, worked out once per write
+def derive_post_fields(html):
+    text = html_to_text(html)
+    return {
+        'body_html': sanitize_html(html),
+        'excerpt': make_excerpt(text),
+        'word_count': len(text.split()),
+    }
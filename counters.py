@@ -0,0 +1,128 @@
+import atexit
+import logging
+import threading
+
+from sqlalchemy import bindparam, select
+
+
+logger = logging.getLogger(__name__)
+
+
+def upsert(engine, table, key, column, parent_key):
+    """``INSERT ... SELECT ... ON CONFLICT`` adding the inserted ``column`` onto the stored one.
+
+    Takes ``id`` and ``count`` parameters. Rows are only inserted for ids
+    ``parent_key`` still has, so a count for a deleted row is dropped
+    instead of failing the batch or landing on whatever reuses the id.
+    """
+    source = select(bindparam('id', type_=table.c[key].type), bindparam('count', type_=table.c[column].type)) \
+        .where(parent_key == bindparam('id'))
+    if engine.dialect.name == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        statement = insert(table).from_select([key, column], source)
+        return statement.on_duplicate_key_update({column: table.c[column] + statement.inserted[column]})
+    if engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    statement = insert(table).from_select([key, column], source)
+    return statement.on_conflict_do_update(index_elements=[table.c[key]],
+                                           set_={column: table.c[column] + statement.excluded[column]})
+
+
+class ViewCounter:
+    """Counts views in memory and adds them to the database in batches.
+
+    hit() only bumps a dict entry. A background thread writes everything
+    pending every ``interval`` seconds, or as soon as ``threshold`` views
+    are waiting, as one batched UPSERT in one transaction, so a busy page
+    costs one write per flush rather than one per view. Views that fail to
+    write are kept for the next flush; a crash loses what was pending, at
+    most one interval's worth.
+    """
+
+    def __init__(self, interval=10, threshold=1000):
+        self.engine = None
+        self.statement = None
+        self._pending = {}
+        self._waiting = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self.flushes = 0
+        self.flushed = 0
+        self.failures = 0
+        self.configure(interval, threshold)
+
+    def configure(self, interval, threshold):
+        self.interval = interval
+        self.threshold = threshold
+
+    def bind(self, engine, table, parent_key, key='post_id', column='views'):
+        """Write counts to ``column`` of ``table``, for the ids ``parent_key`` has."""
+        self.engine = engine
+        self.statement = upsert(engine, table, key, column, parent_key)
+
+    def hit(self, id):
+        with self._lock:
+            self._pending[id] = self._pending.get(id, 0) + 1
+            self._waiting += 1
+            full = self._waiting >= self.threshold
+            # Threads don't survive a fork, so start it on first use in the worker
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='view-counter', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+        if full:
+            self._wake.set()
+
+    def discard(self, id):
+        """Forget the views of ``id`` not written yet, e.g. once it's deleted."""
+        with self._lock:
+            self._waiting -= self._pending.pop(id, 0)
+
+    def pending(self, id):
+        """Views of ``id`` this process has counted but not written yet."""
+        return self._pending.get(id, 0)
+
+    def flush(self):
+        """Write out everything pending. Returns how many ids were written."""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            self._waiting = 0
+        if not batch:
+            return 0
+
+        try:
+            with self.engine.begin() as connection:
+                connection.execute(self.statement, [{'id': id, 'count': views}
+                                                    for id, views in batch.items()])
+        except Exception:
+            logger.exception("Could not write %d view counts, keeping them for the next flush", len(batch))
+            with self._lock:
+                for id, views in batch.items():
+                    self._pending[id] = self._pending.get(id, 0) + views
+                    self._waiting += views
+                self.failures += 1
+            return 0
+
+        with self._lock:
+            self.flushes += 1
+            self.flushed += sum(batch.values())
+        return len(batch)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending_views": self._waiting,
+                "pending_ids": len(self._pending),
+                "flushes": self.flushes,
+                "flushed_views": self.flushed,
+                "failures": self.failures,
+            }
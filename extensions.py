@@ -0,0 +1,81 @@
+from flask_sqlalchemy import SQLAlchemy
+from flask_login import LoginManager
+from flask_ckeditor import CKEditor
+
+from cache import TTLCache
+from images import ImagePipeline
+from passwords import PasswordHasher
+from assets import AssetManifest
+from fragments import FragmentCache, FragmentCacheExtension
+from counters import ViewCounter
+from ratelimit import RateLimiter
+from admission import AdmissionControl
+import timing
+
+
+# Created unbound so models and views can import them; create_app binds
+# them to the app and its config through init_app
+db = SQLAlchemy()
+login_manager = LoginManager()
+ckeditor = CKEditor()
+
+# Uploaded pictures are stored by content hash and resized in the background
+image_pipeline = ImagePipeline()
+# Every password hash and check in the app goes through here
+password_hasher = PasswordHasher()
+# Signed in users, see models.load_user
+user_cache = TTLCache()
+# Rendered post pages, one entry per post holding a page per viewer role
+post_pages = TTLCache()
+# The serialized Atom feed, rebuilt only after posts change
+feed_cache = TTLCache(1)
+# Template fragments such as the navbar and post cards, see fragments.py
+fragment_cache = FragmentCache()
+# Post views waiting to be written, see counters.py
+view_counter = ViewCounter()
+# The most viewed posts on the admin page, kept between flushes
+most_viewed = TTLCache(1)
+# Token buckets for logins, searches and sign ups, see ratelimit.py
+rate_limiter = RateLimiter()
+# Caps on concurrent listings and uploads, see admission.py
+admission = AdmissionControl()
+# Stack samples of the requests the admin asked to profile, see timing.py
+profiler = timing.SamplingProfiler()
+# Hashed copies of the static files made by `flask collect-static`
+asset_manifest = AssetManifest()
+
+
+def init_app(app):
+    ckeditor.init_app(app)
+    db.init_app(app)
+    login_manager.init_app(app)
+    login_manager.login_view = 'main.login'
+
+    image_pipeline.configure(app.config['UPLOAD_FOLDER'],
+                             max_workers=app.config['IMAGE_WORKERS'],
+                             max_pending=app.config['IMAGE_QUEUE_SIZE'])
+    password_hasher.configure(algorithm=app.config['PASSWORD_HASH_ALGORITHM'],
+                              iterations=app.config['PASSWORD_HASH_ITERATIONS'],
+                              max_concurrent=app.config['PASSWORD_HASH_CONCURRENCY'],
+                              max_queued=app.config['PASSWORD_HASH_QUEUE_SIZE'],
+                              timeout=app.config['PASSWORD_HASH_TIMEOUT'])
+    user_cache.configure(app.config['USER_CACHE_SIZE'], app.config['USER_CACHE_TTL'])
+    post_pages.configure(app.config['POST_CACHE_SIZE'], app.config['POST_CACHE_TTL'])
+    feed_cache.configure(1, app.config['FEED_CACHE_TTL'])
+    view_counter.configure(app.config['VIEW_FLUSH_INTERVAL'], app.config['VIEW_FLUSH_THRESHOLD'])
+    most_viewed.configure(1, app.config['VIEW_FLUSH_INTERVAL'])
+    rate_limiter.configure(app.config['RATELIMITS'], app.config['RATELIMIT_STORAGE'],
+                           enabled=app.config['RATELIMIT_ENABLED'])
+    admission.configure(app.config['ADMISSION_CLASSES'], app.config['ADMISSION_ROUTES'],
+                        enabled=app.config['ADMISSION_ENABLED'])
+    asset_manifest.load(app.static_folder)
+
+    profiler.configure(app.config['PROFILER_INTERVAL_MS'] / 1000)
+    if app.config['TIMING_LOG']:
+        timing.enable_log()
+
+    # Time every template render, see timing.TimedTemplate
+    app.jinja_env.template_class = timing.TimedTemplate
+    fragment_cache.configure(app.config['FRAGMENT_CACHE_SIZE'], app.config['FRAGMENT_CACHE_TTL'])
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.jinja_env.fragment_cache = fragment_cache
@@ -0,0 +1,54 @@
+from datetime import datetime
+from xml.etree import ElementTree
+
+ATOM_NS = 'http://www.w3.org/2005/Atom'
+
+
+def _timestamp(when):
+    # Atom wants RFC 3339; stored dates are naive UTC
+    return when.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _add(parent, tag, text=None, **attrs):
+    element = ElementTree.SubElement(parent, tag, attrs)
+    if text is not None:
+        element.text = text
+    return element
+
+
+def feed_updated(posts):
+    """The newest change among ``posts``, which is when the feed last changed."""
+    times = [post.updated_at or post.date_posted for post in posts]
+    times = [when for when in times if when is not None]
+    return max(times) if times else datetime(1970, 1, 1)
+
+
+def atom_feed(title, feed_url, site_url, posts, post_url, entry_id=None):
+    """Serialize ``posts`` as an Atom feed and return the UTF-8 bytes.
+
+    Each entry carries the stored excerpt as its summary, so building the
+    feed never needs the post bodies. ``post_url`` maps a post to its link
+    and ``entry_id`` to its permanent id (the link, if not given).
+    """
+    feed = ElementTree.Element('feed', xmlns=ATOM_NS)
+    _add(feed, 'title', title)
+    _add(feed, 'id', feed_url)
+    _add(feed, 'updated', _timestamp(feed_updated(posts)))
+    _add(feed, 'link', rel='self', type='application/atom+xml', href=feed_url)
+    _add(feed, 'link', rel='alternate', type='text/html', href=site_url)
+
+    for post in posts:
+        url = post_url(post)
+        entry = _add(feed, 'entry')
+        _add(entry, 'title', post.title)
+        _add(entry, 'id', entry_id(post) if entry_id else url)
+        _add(entry, 'link', rel='alternate', type='text/html', href=url)
+        _add(entry, 'published', _timestamp(post.date_posted or feed_updated([post])))
+        _add(entry, 'updated', _timestamp(feed_updated([post])))
+        if post.poster is not None:
+            author = _add(entry, 'author')
+            _add(author, 'name', post.poster.name)
+        if post.excerpt:
+            _add(entry, 'summary', post.excerpt, type='text')
+
+    return ElementTree.tostring(feed, encoding='utf-8', xml_declaration=True)
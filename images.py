@@ -0,0 +1,179 @@
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import timing
+
+
+logger = logging.getLogger(__name__)
+
+# Widths every uploaded picture gets resized to
+THUMBNAIL_SIZES = (64, 150, 300)
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+
+# Extensions we keep for the stored original, anything else is refused
+ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
+
+# Stored names: a content hash (plus _<width> for thumbnails), or the uuid1
+# prefix uploads got before they were content addressed
+CONTENT_ADDRESSED = re.compile(r'^[0-9a-f]{32}(_\d+)?\.\w+$')
+LEGACY_UPLOAD = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}_')
+
+
+class ImagePipeline:
+    """Stores uploads content-addressed and builds thumbnails off the request thread.
+
+    At most ``max_workers`` images are decoded at once and at most
+    ``max_pending`` wait for a worker; past that, uploads are stored but
+    their thumbnails are left for ``flask rebuild-thumbnails``.
+    """
+
+    def __init__(self, folder=None, max_workers=2, max_pending=16):
+        self._executor = None
+        self._lock = threading.Lock()
+        self.configure(folder, max_workers, max_pending)
+
+    def configure(self, folder, max_workers=2, max_pending=16):
+        self.folder = folder
+        self.max_workers = max_workers
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+
+    def _pool(self):
+        # Threads don't survive a fork, so start them on first use in the worker
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='images')
+            return self._executor
+
+    def save_upload(self, upload, on_done=None):
+        """Write an uploaded FileStorage under its content hash and queue its thumbnails.
+
+        Returns the stored file name. Identical uploads map to the same file,
+        so re-uploading a picture doesn't write it again. ``on_done`` is called
+        from the worker once the thumbnails exist.
+        """
+        ext = os.path.splitext(upload.filename or '')[1].lower()
+        if ext not in ALLOWED_EXTENSIONS:
+            raise ValueError("Unsupported image type %r" % ext)
+        if ext == '.jpeg':
+            ext = '.jpg'
+
+        with timing.phase('upload'):
+            data = upload.read()
+            name = hashlib.sha256(data).hexdigest()[:32] + ext
+            path = os.path.join(self.folder, name)
+            if not os.path.exists(path):
+                _write_atomic(path, lambda f: f.write(data))
+
+        self.submit(name, on_done)
+        return name
+
+    def submit(self, name, on_done=None):
+        if not self._slots.acquire(blocking=False):
+            logger.warning("Image queue full, skipping thumbnails for %s", name)
+            return None
+        future = self._pool().submit(self._process, name, on_done)
+        future.add_done_callback(lambda f: self._slots.release())
+        return future
+
+    def _process(self, name, on_done):
+        try:
+            if make_thumbnails(self.folder, name) and on_done is not None:
+                on_done()
+        except Exception:
+            logger.exception("Could not make thumbnails for %s", name)
+
+
+def is_content_addressed(name):
+    # The bytes behind these names never change, so they can be cached forever
+    return CONTENT_ADDRESSED.match(os.path.basename(name)) is not None
+
+
+def is_upload(name):
+    name = os.path.basename(name)
+    return is_content_addressed(name) or LEGACY_UPLOAD.match(name) is not None
+
+
+def thumbnail_name(name, width, fmt):
+    stem = os.path.splitext(name)[0]
+    return '%s_%d.%s' % (stem, width, fmt)
+
+
+def fallback_format(name):
+    # Keep transparency for formats that can have it
+    return 'jpg' if os.path.splitext(name)[1] == '.jpg' else 'png'
+
+
+def make_thumbnails(folder, name):
+    """Decode ``name`` once and write every missing thumbnail size as WebP and JPEG/PNG."""
+    fallback = fallback_format(name)
+    wanted = [w for w in THUMBNAIL_SIZES
+              if not os.path.exists(os.path.join(folder, thumbnail_name(name, w, 'webp')))
+              or not os.path.exists(os.path.join(folder, thumbnail_name(name, w, fallback)))]
+    if not wanted:
+        return 0
+
+    # Pillow is only needed by the workers, keep it out of app start up
+    from PIL import Image, ImageOps
+
+    with Image.open(os.path.join(folder, name)) as original:
+        image = ImageOps.exif_transpose(original)
+        image = image.convert('RGBA' if fallback == 'png' else 'RGB')
+
+    for width in sorted(wanted, reverse=True):
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS)
+        else:
+            resized = image
+        _save(resized, os.path.join(folder, thumbnail_name(name, width, 'webp')),
+              'WEBP', quality=WEBP_QUALITY, method=4)
+        if fallback == 'jpg':
+            _save(resized, os.path.join(folder, thumbnail_name(name, width, 'jpg')),
+                  'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+        else:
+            _save(resized, os.path.join(folder, thumbnail_name(name, width, 'png')),
+                  'PNG', optimize=True)
+    return len(wanted)
+
+
+def _save(image, path, fmt, **options):
+    _write_atomic(path, lambda f: image.save(f, fmt, **options))
+
+
+# Pages check whether an image exists by looking for the file, so write it
+# somewhere private first and only move it into place once complete
+def _write_atomic(path, write):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        # mkstemp files are owner-only, these get served to everyone
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def thumbnail_files(folder, name, width):
+    """Return (webp, fallback) file names for a picture.
+
+    Until the thumbnails are built webp is None and fallback is the original.
+    """
+    if not name:
+        return None, None
+    webp = thumbnail_name(name, width, 'webp')
+    fallback = thumbnail_name(name, width, fallback_format(name))
+    if not os.path.exists(os.path.join(folder, webp)):
+        webp = None
+    if not os.path.exists(os.path.join(folder, fallback)):
+        # Old uploads and ones still in the queue are served as they are
+        fallback = name
+    return webp, fallback
@@ -0,0 +1,34 @@
+"""added posts search index
+
+Revision ID: b7e3d51a2c08
+Revises: a1c4e2f9b3d7
+Create Date: 2026-10-18 11:26:40.902115
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import orm
+
+import search_index
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3d51a2c08'
+down_revision = 'a1c4e2f9b3d7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The FTS5 index only exists on SQLite, other databases search with LIKE
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    session = orm.Session(bind=op.get_bind())
+    search_index.rebuild(session)
+    session.flush()
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute("DROP TABLE IF EXISTS %s" % search_index.FTS_TABLE)
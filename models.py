@@ -0,0 +1,181 @@
+from datetime import datetime
+
+from sqlalchemy import event, func, update
+from flask_login import UserMixin
+
+from content import derive_post_fields, reading_minutes
+from slugs import unique_slug
+import search_index
+from extensions import db, login_manager, password_hasher, user_cache, view_counter
+
+
+@login_manager.user_loader
+def load_user(user_id):
+    user_id = int(user_id)
+    identity = user_cache.get(user_id)
+    if identity is None:
+        user = db.session.get(Users, user_id)
+        if user is None:
+            return None
+        identity = UserIdentity(user)
+        user_cache.set(user_id, identity, tags=('user:%d' % user_id,))
+    return identity
+
+
+# Create User Model
+class Users(db.Model, UserMixin):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(20), nullable=False, unique=True)
+    name = db.Column(db.String(100), nullable=False)
+    # Looked up by add_user and test_pw
+    email = db.Column(db.String(100), index=True)
+    fav_color = db.Column(db.String(40))
+    about_author = db.Column(db.Text(500), nullable=True)
+    # The user list on /user/add is in signup order
+    date_added = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    passwd = db.Column(db.String(126), nullable=False)
+    profile_pic = db.Column(db.String(), nullable=True)
+    # Author stats, kept up to date as posts come and go so showing them is
+    # a read of this row. See count_post, uncount_post and recount_posts
+    post_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_posted_at = db.Column(db.DateTime)
+
+    # User Can Have Many Posts
+    posts = db.relationship('Posts', backref='poster')
+
+    @property
+    def password(self):
+        raise AttributeError("password is not readable")
+
+    @password.setter
+    def password(self, password):
+        self.passwd = password_hasher.hash(password)
+
+    def verify_password(self, password):
+        if not password_hasher.verify(self.passwd, password):
+            return False
+        # Bring hashes made with old settings up to date while we have the password
+        if password_hasher.needs_rehash(self.passwd):
+            self.password = password
+        return True
+
+    @classmethod
+    def count_post(cls, user_id, date_posted):
+        """Count a new post of ``user_id``'s, as part of the transaction adding it.
+
+        New posts are the newest, so ``date_posted`` becomes last_posted_at.
+        """
+        db.session.execute(update(cls).where(cls.id == user_id).values(
+            post_count=cls.post_count + 1, last_posted_at=date_posted))
+
+    @classmethod
+    def uncount_post(cls, user_id):
+        """Stop counting a deleted post of ``user_id``'s. Run after the delete is flushed."""
+        db.session.execute(update(cls).where(cls.id == user_id).values(
+            post_count=cls.post_count - 1,
+            last_posted_at=cls._latest_post()))
+
+    @classmethod
+    def recount_posts(cls, user_ids=None):
+        """Work the author stats out again from the posts table, e.g. after a bulk import."""
+        count = db.select(func.count()).where(Posts.post_id == cls.id).scalar_subquery()
+        statement = update(cls).values(post_count=count, last_posted_at=cls._latest_post())
+        if user_ids is not None:
+            statement = statement.where(cls.id.in_(user_ids))
+        db.session.execute(statement)
+
+    @classmethod
+    def _latest_post(cls):
+        # One seek into ix_posts_post_id_date_posted
+        return db.select(func.max(Posts.date_posted)).where(Posts.post_id == cls.id).scalar_subquery()
+
+    # Create A String
+    def __repr__(self):
+        return '<Name %r>' % self.name
+
+
+# What current_user holds between requests: a plain copy of the Users row,
+# so it can be cached outside the database session
+class UserIdentity(UserMixin):
+    FIELDS = ('id', 'username', 'name', 'email', 'fav_color', 'about_author',
+              'date_added', 'profile_pic')
+
+    def __init__(self, user):
+        self.update(user)
+
+    def update(self, user):
+        for field in self.FIELDS:
+            setattr(self, field, getattr(user, field))
+
+    def __repr__(self):
+        return '<Name %r>' % self.name
+
+
+# Create a BLog Post Model
+class Posts(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(255), nullable=False)
+    # The full post bodies are only loaded when something asks for them
+    content = db.deferred(db.Column(db.Text), group='body')
+    # author = db.Column(db.String(255))
+    date_posted = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Post urls are /posts/<slug>, see free_slug
+    slug = db.Column(db.String(255), index=True, unique=True)
+
+    # Worked out from content on every write, see derive_post_fields
+    body_html = db.deferred(db.Column(db.Text), group='body')
+    excerpt = db.Column(db.Text)
+    word_count = db.Column(db.Integer)
+
+    # ForeignKey To Link Users (refer to primary of the user)
+    post_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+
+    # Stored view count, see PostViews
+    view_count = db.relationship('PostViews', uselist=False, viewonly=True)
+
+    # Listings seek on (date_posted, id) for keyset pagination, and author
+    # pages on the same within one user's posts
+    __table_args__ = (
+        db.Index('ix_posts_date_posted_id', 'date_posted', 'id'),
+        db.Index('ix_posts_post_id_date_posted', 'post_id', 'date_posted', 'id'),
+    )
+
+    @db.validates('content')
+    def validate_content(self, key, content):
+        for field, value in derive_post_fields(content).items():
+            setattr(self, field, value)
+        return content
+
+    @property
+    def reading_time(self):
+        return reading_minutes(self.word_count)
+
+    @property
+    def views(self):
+        """Stored views plus the ones this worker hasn't written yet."""
+        stored = self.view_count.views if self.view_count is not None else 0
+        return stored + view_counter.pending(self.id)
+
+    @classmethod
+    def free_slug(cls, text, title='', post_id=None):
+        """A slug for ``text`` that no other post has, numbered if need be."""
+        def taken(slug):
+            query = db.session.query(cls.id).filter(cls.slug == slug)
+            if post_id is not None:
+                query = query.filter(cls.id != post_id)
+            return db.session.query(query.exists()).scalar()
+        return unique_slug(text, taken, fallback=title)
+
+
+# Views per post, added to in batches by counters.ViewCounter. Kept apart
+# from posts so counting never rewrites the rows listings read
+class PostViews(db.Model):
+    __tablename__ = 'post_views'
+    post_id = db.Column(db.Integer, db.ForeignKey('posts.id', ondelete='CASCADE'), primary_key=True)
+    # Indexed for the most viewed list on the admin page
+    views = db.Column(db.Integer, nullable=False, default=0, index=True)
+
+
+# Build the full-text index whenever the posts table gets created
+event.listen(Posts.__table__, 'after_create', search_index.CREATE_DDL)
@@ -0,0 +1,81 @@
+import base64
+import binascii
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+
+# Cursors are opaque to the client: "<iso timestamp>|<id>" in urlsafe base64
+def encode_cursor(date_posted, id):
+    raw = "%s|%d" % (date_posted.isoformat(), id)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        stamp, id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(stamp), int(id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        # A mangled cursor just starts the listing from the top
+        return None
+
+
+class KeysetPage:
+    """One page of a keyset-paginated query plus the cursors around it."""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def keyset_paginate(query, sort_column, id_column, per_page, after=None, before=None):
+    """Return a KeysetPage ordered ascending on (sort_column, id_column).
+
+    ``after`` and ``before`` are cursors as produced by encode_cursor. Only
+    ``per_page + 1`` rows are ever fetched, and the WHERE clause seeks
+    straight into the (sort_column, id_column) index, so the cost of a page
+    doesn't depend on how deep into the listing it is.
+    """
+    key = tuple_(sort_column, id_column)
+    after = decode_cursor(after)
+    before = decode_cursor(before) if after is None else None
+
+    if before is not None:
+        # Walk backwards from the cursor, then flip the rows back into order
+        rows = query.filter(key < before) \
+            .order_by(sort_column.desc(), id_column.desc()) \
+            .limit(per_page + 1).all()
+        more = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        has_prev, has_next = more, True
+    else:
+        if after is not None:
+            query = query.filter(key > after)
+        rows = query.order_by(sort_column, id_column).limit(per_page + 1).all()
+        items = rows[:per_page]
+        has_prev, has_next = after is not None, len(rows) > per_page
+
+    def cursor_for(row):
+        return encode_cursor(getattr(row, sort_column.key), getattr(row, id_column.key))
+
+    next_cursor = cursor_for(items[-1]) if items and has_next else None
+    prev_cursor = cursor_for(items[0]) if items and has_prev else None
+    return KeysetPage(items, next_cursor=next_cursor, prev_cursor=prev_cursor)
@@ -0,0 +1,71 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+import timing
+
+
+class HasherBusy(Exception):
+    """Raised when every hashing slot is taken, so the caller can back off."""
+
+
+class PasswordHasher:
+    """Hashes and checks passwords on a small pool of threads.
+
+    Only ``max_concurrent`` hashes run at once and at most ``max_queued``
+    more may wait; anything past that, or waiting longer than ``timeout``
+    seconds, raises HasherBusy instead of piling more work onto the CPU.
+    """
+
+    def __init__(self, algorithm='sha256', iterations=260000, salt_length=16,
+                 max_concurrent=2, max_queued=8, timeout=10):
+        self._executor = None
+        self._lock = threading.Lock()
+        self.configure(algorithm, iterations, salt_length, max_concurrent, max_queued, timeout)
+
+    def configure(self, algorithm='sha256', iterations=260000, salt_length=16,
+                  max_concurrent=2, max_queued=8, timeout=10):
+        self.method = 'pbkdf2:%s:%d' % (algorithm, iterations)
+        self.salt_length = salt_length
+        self.timeout = timeout
+        self.max_concurrent = max_concurrent
+        self._slots = threading.BoundedSemaphore(max_concurrent + max_queued)
+
+    def _pool(self):
+        # Threads don't survive a fork, so start them on first use in the worker
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent,
+                                                    thread_name_prefix='passwords')
+            return self._executor
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password,
+                         method=self.method, salt_length=self.salt_length)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        # Werkzeug hashes start with the method they were made with
+        return pwhash.split('$', 1)[0] != self.method
+
+    def _run(self, fn, *args, **kwargs):
+        with timing.phase('hash'):
+            return self._wait(fn, *args, **kwargs)
+
+    def _wait(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            future = self._pool().submit(fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise HasherBusy()
@@ -0,0 +1,86 @@
+import re
+
+from sqlalchemy import event
+
+
+# EXPLAIN QUERY PLAN rows that mean the query reads a whole table, or sorts
+# rows no index hands over in order. Virtual tables (the search index) are fine
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?\w+( AS \w+)?$')
+TEMP_BTREE = re.compile(r'USE TEMP B-TREE')
+# A scan along an index reads every row too, unless a LIMIT stops it early
+INDEX_SCAN = re.compile(r'^SCAN (TABLE )?\w+( AS \w+)? USING (COVERING )?INDEX \w+$')
+LIMIT = re.compile(r'\bLIMIT\b', re.IGNORECASE)
+
+
+class Finding:
+    """One distinct statement, where it came from and what its plan looks like."""
+
+    def __init__(self, label, statement, plan):
+        self.label = label
+        self.statement = statement
+        self.plan = plan
+        limited = LIMIT.search(statement) is not None
+        self.problems = [detail for detail in plan
+                         if FULL_SCAN.match(detail) or TEMP_BTREE.search(detail)
+                         or (INDEX_SCAN.match(detail) and not limited)]
+
+    def __str__(self):
+        lines = ['[%s] %s' % (self.label, ' '.join(self.statement.split()))]
+        lines += ['    %s%s' % ('!! ' if detail in self.problems else '   ', detail) for detail in self.plan]
+        return '\n'.join(lines)
+
+
+class QueryAudit:
+    """Records the statements run on a SQLite ``engine`` and explains them.
+
+        with QueryAudit(db.engine) as audit:
+            client.get('/posts')
+        audit.assert_indexed()
+
+    Set ``label`` to say what the next statements belong to (a route, a
+    test). Each distinct statement is explained once, with the parameters
+    it was first run with.
+    """
+
+    def __init__(self, engine, label=None):
+        self.engine = engine
+        self.label = label
+        self.statements = {}
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if executemany or not statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE', 'WITH')):
+            return
+        self.statements.setdefault(statement, (parameters, self.label))
+
+    def findings(self):
+        connection = self.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            findings = []
+            for statement, (parameters, label) in self.statements.items():
+                cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+                # Rows are (id, parent, notused, detail)
+                plan = [row[3] for row in cursor.fetchall()]
+                findings.append(Finding(label, statement, plan))
+            cursor.close()
+            return findings
+        finally:
+            connection.close()
+
+    def problems(self, allow=()):
+        """Findings with a full or unlimited index scan or a temp B-tree, less those matching a regex in ``allow``."""
+        return [finding for finding in self.findings() if finding.problems
+                and not any(re.search(pattern, finding.statement) for pattern in allow)]
+
+    def assert_indexed(self, allow=()):
+        problems = self.problems(allow)
+        if problems:
+            raise AssertionError("%d statements scan or sort without an index:\n%s"
+                                 % (len(problems), '\n'.join(str(p) for p in problems)))
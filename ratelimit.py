@@ -0,0 +1,149 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def parse_limit(text):
+    """ "5/minute" -> (capacity 5, refilling at 5/60 tokens a second)."""
+    count, _, period = text.partition('/')
+    count = int(count)
+    return count, count / PERIODS[period.strip()]
+
+
+class MemoryBuckets:
+    """Token buckets in this process: a dict entry and a lock per check.
+
+    Holds at most ``max_entries`` buckets, dropping the least recently used
+    (an idle bucket is a full one, so forgetting it changes nothing but the
+    burst of a client that comes back within the refill period).
+    """
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        """Take a token from ``key``'s bucket. Returns 0, or how many seconds until one is free."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, stamp = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - stamp) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                self._buckets.move_to_end(key)
+                if len(self._buckets) > self.max_entries:
+                    self._buckets.popitem(last=False)
+                return 0
+            return (1 - tokens) / rate
+
+
+class SQLiteBuckets:
+    """Token buckets in a SQLite file, shared by every worker on the host.
+
+    A check is one UPSERT that refills and takes a token only if there is
+    one to take; a denied check reads the bucket back to say how long to
+    wait. The file holds nothing worth keeping, so it runs without syncing.
+    Every ``prune_every`` checks a worker drops buckets untouched for a day,
+    which have long since filled up again.
+    """
+
+    TAKE = """
+        INSERT INTO buckets (key, tokens, stamp) VALUES (:key, :capacity - 1, :now)
+        ON CONFLICT (key) DO UPDATE
+            SET tokens = min(:capacity, tokens + (:now - stamp) * :rate) - 1, stamp = :now
+            WHERE min(:capacity, tokens + (:now - stamp) * :rate) >= 1
+        RETURNING tokens
+    """
+
+    def __init__(self, path, prune_every=10000):
+        self.path = path
+        self.prune_every = prune_every
+        self._local = threading.local()
+        self._checks = 0
+
+    def _connection(self):
+        # One connection per thread, opened again in a forked worker
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA synchronous = OFF')
+            connection.execute('CREATE TABLE IF NOT EXISTS buckets '
+                               '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, stamp REAL NOT NULL)')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def take(self, key, capacity, rate):
+        """Take a token from ``key``'s bucket. Returns 0, or how many seconds until one is free."""
+        connection = self._connection()
+        # Wall clock time, monotonic clocks aren't shared between processes
+        now = time.time()
+        params = {'key': key, 'capacity': capacity, 'rate': rate, 'now': now}
+        self._checks += 1
+        if self._checks % self.prune_every == 0:
+            connection.execute('DELETE FROM buckets WHERE stamp < ?', (now - PERIODS['day'],))
+        if connection.execute(self.TAKE, params).fetchone() is not None:
+            return 0
+        row = connection.execute('SELECT tokens, stamp FROM buckets WHERE key = ?', (key,)).fetchone()
+        tokens = min(capacity, row[0] + (now - row[1]) * rate)
+        return max(0, (1 - tokens) / rate)
+
+
+def buckets_for(storage):
+    """'memory', or 'sqlite:///<path>' for buckets shared between workers."""
+    if storage == 'memory':
+        return MemoryBuckets()
+    if storage.startswith('sqlite:///'):
+        return SQLiteBuckets(storage[len('sqlite:///'):])
+    raise ValueError("Unknown rate limit storage %r" % storage)
+
+
+class RateLimiter:
+    """Per endpoint limits, each checked per client IP and per account.
+
+    ``limits`` maps an endpoint to its rule, e.g.
+    ``{'methods': ('POST',), 'ip': '20/minute', 'account': '5/minute'}``;
+    leave out 'ip' or 'account' to not limit on it. Endpoints without a
+    rule cost one dict lookup.
+    """
+
+    def __init__(self):
+        self.configure({}, 'memory')
+
+    def configure(self, limits, storage='memory', enabled=True):
+        self.enabled = enabled
+        self.buckets = buckets_for(storage)
+        self.rules = {}
+        for endpoint, rule in limits.items():
+            self.rules[endpoint] = (
+                frozenset(rule.get('methods', ('GET', 'POST'))),
+                [(scope, parse_limit(rule[scope])) for scope in ('ip', 'account') if rule.get(scope)],
+            )
+        self.limited = 0
+
+    def check(self, endpoint, method, ip, account=lambda: None):
+        """Returns None if the request may go ahead, otherwise seconds until it may.
+
+        ``account`` is only called for endpoints limited per account.
+        """
+        rule = self.rules.get(endpoint)
+        if rule is None or not self.enabled or method not in rule[0]:
+            return None
+        for scope, (capacity, rate) in rule[1]:
+            who = ip if scope == 'ip' else account()
+            if who is None:
+                continue
+            wait = self.buckets.take('%s:%s:%s' % (endpoint, scope, who), capacity, rate)
+            if wait:
+                self.limited += 1
+                return max(1, math.ceil(wait))
+        return None
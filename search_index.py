@@ -0,0 +1,134 @@
+from markupsafe import Markup, escape
+from sqlalchemy import DDL, text
+
+from content import html_to_text
+
+
+# Full-text index over posts, kept in an SQLite FTS5 table keyed by post id.
+# On any other database search falls back to a LIKE scan.
+FTS_TABLE = 'posts_fts'
+
+# Column weights for bm25(): a hit in the title counts most, then the slug
+TITLE_WEIGHT = 10.0
+SLUG_WEIGHT = 5.0
+BODY_WEIGHT = 1.0
+
+# Markers put around matches by snippet(), swapped for <mark> after escaping
+HIT_START = '\x02'
+HIT_END = '\x03'
+
+
+class SearchHit:
+
+    def __init__(self, post, snippet):
+        self.post = post
+        self.snippet = snippet
+
+
+def uses_fts(session):
+    return session.get_bind().dialect.name == 'sqlite'
+
+
+CREATE_SQL = ("CREATE VIRTUAL TABLE IF NOT EXISTS %s USING fts5("
+              "title, slug, body, tokenize='porter unicode61')" % FTS_TABLE)
+
+# Attached to the posts table so db.create_all() builds the index as well
+CREATE_DDL = DDL(CREATE_SQL).execute_if(dialect='sqlite')
+
+
+def create_index(session):
+    session.execute(text(CREATE_SQL))
+
+
+def index_post(session, post):
+    """Add or refresh a post in the index. The post must have an id already."""
+    if not uses_fts(session):
+        return
+    unindex_post(session, post.id)
+    session.execute(
+        text("INSERT INTO %s (rowid, title, slug, body) VALUES (:id, :title, :slug, :body)" % FTS_TABLE),
+        {'id': post.id, 'title': post.title, 'slug': post.slug or '',
+         'body': html_to_text(post.content)})
+
+
+def unindex_post(session, post_id):
+    if not uses_fts(session):
+        return
+    session.execute(text("DELETE FROM %s WHERE rowid = :id" % FTS_TABLE), {'id': post_id})
+
+
+def rebuild(session, batch_size=500):
+    """Drop the index and fill it again from the posts table. Returns the row count."""
+    if not uses_fts(session):
+        return 0
+    session.execute(text("DROP TABLE IF EXISTS %s" % FTS_TABLE))
+    create_index(session)
+    return index_after(session, 0, batch_size)
+
+
+def index_after(session, last_id, batch_size=500):
+    """Index every post with an id above ``last_id``, e.g. after a bulk insert."""
+    if not uses_fts(session):
+        return 0
+
+    count = 0
+    while True:
+        rows = session.execute(
+            text("SELECT id, title, slug, content FROM posts WHERE id > :last ORDER BY id LIMIT :n"),
+            {'last': last_id, 'n': batch_size}).all()
+        if not rows:
+            break
+        session.execute(
+            text("INSERT INTO %s (rowid, title, slug, body) VALUES (:id, :title, :slug, :body)" % FTS_TABLE),
+            [{'id': r.id, 'title': r.title, 'slug': r.slug or '', 'body': html_to_text(r.content)}
+             for r in rows])
+        count += len(rows)
+        last_id = rows[-1].id
+    return count
+
+
+# Quote every word so user input can never be read as FTS5 query syntax,
+# and let the words match as prefixes the way the old LIKE search did
+def match_expression(term):
+    words = term.split()
+    return ' '.join('"%s"*' % w.replace('"', '""') for w in words)
+
+
+def highlight(snippet):
+    html = str(escape(snippet))
+    return Markup(html.replace(HIT_START, '<mark>').replace(HIT_END, '</mark>'))
+
+
+def search_posts(session, query, term, page=1, per_page=10):
+    """Return (hits, has_next) for one page of results ranked best first.
+
+    ``query`` is the Posts query used to load the matching rows, so callers
+    can attach their own loader options to it.
+    """
+    model = query.column_descriptions[0]['entity']
+    offset = (page - 1) * per_page
+
+    if not uses_fts(session):
+        pattern = '%' + term + '%'
+        posts = query.filter(model.title.like(pattern) | model.content.like(pattern)) \
+            .order_by(model.title).offset(offset).limit(per_page + 1).all()
+        hits = [SearchHit(p, escape(html_to_text(p.content)[:200])) for p in posts[:per_page]]
+        return hits, len(posts) > per_page
+
+    expression = match_expression(term)
+    if not expression:
+        return [], False
+
+    rows = session.execute(
+        text("SELECT rowid AS id, snippet(%s, 2, :start, :end, '...', 24) AS snippet "
+             "FROM %s WHERE %s MATCH :expression "
+             "ORDER BY bm25(%s, :tw, :sw, :bw) LIMIT :n OFFSET :offset"
+             % (FTS_TABLE, FTS_TABLE, FTS_TABLE, FTS_TABLE)),
+        {'start': HIT_START, 'end': HIT_END, 'expression': expression,
+         'tw': TITLE_WEIGHT, 'sw': SLUG_WEIGHT, 'bw': BODY_WEIGHT,
+         'n': per_page + 1, 'offset': offset}).all()
+
+    page_rows = rows[:per_page]
+    posts = {p.id: p for p in query.filter(model.id.in_([r.id for r in page_rows]))}
+    hits = [SearchHit(posts[r.id], highlight(r.snippet)) for r in page_rows if r.id in posts]
+    return hits, len(rows) > per_page
@@ -0,0 +1,28 @@
+import re
+import unicodedata
+
+
+# Posts.slug is a String(255); leave room for a "-<n>" suffix
+MAX_LENGTH = 240
+
+
+def slugify(text):
+    """Lower case ASCII words joined by hyphens, e.g. "Hello, World!" -> "hello-world"."""
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode()
+    slug = re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+    slug = slug[:MAX_LENGTH].rstrip('-')
+    # /posts/<int:id> would catch an all digit slug before /posts/<slug> saw it
+    if slug.isdigit():
+        slug = 'post-' + slug
+    return slug
+
+
+def unique_slug(text, taken, fallback=''):
+    """slugify ``text`` (or ``fallback`` if that comes out empty) and number it until ``taken(slug)`` is false."""
+    base = slugify(text) or slugify(fallback) or 'post'
+    slug = base
+    n = 2
+    while taken(slug):
+        slug = '%s-%d' % (base, n)
+        n += 1
+    return slug
@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from config import TestingConfig
+from extensions import db, view_counter, user_cache, post_pages, feed_cache, fragment_cache, most_viewed
+
+
+@pytest.fixture
+def app():
+    app = create_app(TestingConfig)
+    # No context is left pushed: requests must get their own, as they do
+    # when served, or g (and current_user with it) carries over between them
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        # Write the views counted so far while their tables are still there
+        view_counter.flush()
+        db.drop_all()
+    # The caches live at module level, don't let one test's pages leak into the next
+    for cache in (user_cache, post_pages, feed_cache, fragment_cache, most_viewed):
+        cache.clear()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
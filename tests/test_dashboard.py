@@ -0,0 +1,19 @@
+from extensions import db, password_hasher
+from models import Users
+
+
+def test_dashboard_shows_the_update(app, client):
+    with app.app_context():
+        db.session.add(Users(username='admin', name='Admin', email='admin@example.com',
+                             passwd=password_hasher.hash('secret')))
+        db.session.commit()
+    client.post('/login', data={'username': 'admin', 'passwd': 'secret'})
+    client.get('/dashboard')
+
+    response = client.post('/dashboard', data={
+        'name': 'Renamed', 'email': 'admin@example.com', 'fav_color': 'red',
+        'username': 'admin', 'about_author': '', 'profile_pic': (b'', ''),
+    }, content_type='multipart/form-data')
+    page = response.get_data(as_text=True)
+    assert 'Renamed' in page
+    assert '<strong>Name:</strong> Admin' not in page
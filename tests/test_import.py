@@ -0,0 +1,17 @@
+import json
+
+from models import Users
+
+
+def test_broken_line_says_where_to_resume(app, tmp_path):
+    path = tmp_path / 'users.jsonl'
+    lines = [json.dumps({'username': 'user%d' % i, 'name': 'User %d' % i, 'passwd': 'x'}) for i in range(5)]
+    lines[3] = '{"username": "user3", "name": '
+    path.write_text('\n'.join(lines) + '\n')
+
+    result = app.test_cli_runner().invoke(args=['users', 'import', str(path), '--batch-size', '2'])
+    assert result.exit_code == 1
+    assert 'record 4: ' in result.output
+    assert 'resume with --offset 2' in result.output
+    with app.app_context():
+        assert Users.query.count() == 2
@@ -0,0 +1,29 @@
+from extensions import db, password_hasher
+from models import Users, Posts
+
+
+def login(app, username):
+    client = app.test_client()
+    assert client.post('/login', data={'username': username, 'passwd': 'secret'}).status_code == 302
+    # Take the "Logged In" flash, pages showing one aren't cached
+    client.get('/dashboard')
+    return client
+
+
+def test_post_of_a_deleted_author(app):
+    passwd = password_hasher.hash('secret')
+    with app.app_context():
+        db.session.add(Users(username='admin', name='Admin', email='admin@example.com', passwd=passwd))
+        db.session.add(Users(username='author', name='Author', email='author@example.com', passwd=passwd))
+        db.session.commit()
+        db.session.add(Posts(title='Left behind', content='<p>Still here</p>', slug='left-behind', post_id=2))
+        db.session.commit()
+
+    login(app, 'author').get('/delete/2')
+    with app.app_context():
+        assert db.session.get(Users, 2) is None
+        assert Posts.query.filter_by(slug='left-behind').one().post_id is None
+
+    response = login(app, 'admin').get('/posts/left-behind')
+    assert response.status_code == 200
+    assert 'Still here' in response.get_data(as_text=True)
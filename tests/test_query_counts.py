@@ -0,0 +1,73 @@
+"""The listing, search and post pages must cost the same number of queries
+whatever the number of posts: a growing count means a query per row crept in."""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+import search_index
+from extensions import db, password_hasher, user_cache, post_pages, feed_cache, fragment_cache, most_viewed
+from models import Users, Posts
+
+URLS = ('/posts', '/search?q=hello', '/posts/post-0')
+# Fewer posts than a page holds, then enough to fill one, each by its own
+# author, so a query per post or per author shows up as a difference
+POSTS = 3
+
+
+def add_posts(app, start, stop):
+    base = datetime(2024, 1, 1)
+    with app.app_context():
+        for i in range(start, stop):
+            db.session.add(Posts(title='Post %d' % i, content='<p>hello <b>world</b> %d</p>' % i,
+                                 slug='post-%d' % i, post_id=1 + i,
+                                 date_posted=base + timedelta(hours=i)))
+        db.session.commit()
+        search_index.rebuild(db.session)
+        Users.recount_posts()
+        db.session.commit()
+
+
+def statements(app, client, url):
+    """Statements run to serve ``url`` with nothing cached."""
+    for cache in (user_cache, post_pages, feed_cache, fragment_cache, most_viewed):
+        cache.clear()
+    count = 0
+
+    def counter(*args):
+        nonlocal count
+        count += 1
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', counter)
+    try:
+        response = client.get(url)
+        # Listings are streamed, their rows are only loaded as the body is read
+        response.get_data()
+    finally:
+        event.remove(engine, 'before_cursor_execute', counter)
+    assert response.status_code == 200, url
+    return count
+
+
+@pytest.fixture
+def seeded(app):
+    passwd = password_hasher.hash('secret')
+    with app.app_context():
+        for i in range(POSTS * 10):
+            db.session.add(Users(username='author%d' % i, name='Author %d' % i,
+                                 email='author%d@example.com' % i, passwd=passwd))
+        db.session.commit()
+    add_posts(app, 0, POSTS)
+    return app
+
+
+@pytest.mark.parametrize('url', URLS)
+def test_statements_do_not_grow_with_posts(seeded, client, url):
+    assert client.post('/login', data={'username': 'author0', 'passwd': 'secret'}).status_code == 302
+    # Take the "Logged In" flash away, a page showing it isn't a typical one
+    client.get('/dashboard')
+    small = statements(seeded, client, url)
+    add_posts(seeded, POSTS, POSTS * 10)
+    assert statements(seeded, client, url) == small
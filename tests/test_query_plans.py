@@ -0,0 +1,79 @@
+"""Every statement the main routes run must use an index: no full table
+scans, no index scans without a LIMIT, no temp B-tree sorts."""
+from datetime import datetime, timedelta
+
+import pytest
+
+import search_index
+from extensions import db, password_hasher, user_cache, post_pages, feed_cache, fragment_cache, most_viewed
+from models import Users, Posts
+from query_audit import QueryAudit
+
+# Search results are ranked by bm25 over the matches, there's no index for that
+ALLOW = (r'\bposts_fts MATCH\b.*ORDER BY bm25',)
+
+ROUTES = [
+    ('GET', '/', None),
+    ('GET', '/posts', None),
+    ('GET', '/posts?after=%(cursor)s', None),
+    ('GET', '/posts/post-5', None),
+    ('GET', '/posts/6', None),
+    ('GET', '/user/author1', None),
+    ('GET', '/me', None),
+    ('GET', '/search?q=hello', None),
+    ('GET', '/feed.atom', None),
+    ('GET', '/api/posts', None),
+    ('GET', '/api/posts/6', None),
+    ('GET', '/dashboard', None),
+    ('GET', '/admin', None),
+    ('GET', '/user/add', None),
+    ('GET', '/posts/edit/6', None),
+    ('POST', '/user/add', {'name': 'New', 'username': 'new', 'email': 'new@example.com',
+                           'fav_color': '', 'passwd': 'secret', 'passwd2': 'secret'}),
+    ('POST', '/test_pw', {'email': 'author1@example.com', 'passwd': 'secret'}),
+    ('POST', '/add_post', {'title': 'Another', 'content': '<p>hello again</p>', 'slug': 'post-5'}),
+]
+
+
+@pytest.fixture
+def seeded(app):
+    passwd = password_hasher.hash('secret')
+    base = datetime(2024, 1, 1)
+    with app.app_context():
+        for i in range(20):
+            db.session.add(Users(username='author%d' % i, name='Author %d' % i,
+                                 email='author%d@example.com' % i, passwd=passwd,
+                                 date_added=base + timedelta(days=i)))
+        db.session.commit()
+        for i in range(200):
+            db.session.add(Posts(title='Post %d' % i, content='<p>hello <b>world</b> %d</p>' % i,
+                                 slug='post-%d' % i, post_id=1 + i % 20,
+                                 date_posted=base + timedelta(hours=i)))
+        db.session.commit()
+        search_index.rebuild(db.session)
+        Users.recount_posts()
+        db.session.commit()
+    return app
+
+
+def test_main_routes_use_indexes(seeded):
+    client = seeded.test_client()
+    assert client.post('/login', data={'username': 'author0', 'passwd': 'secret'}).status_code == 302
+    client.get('/dashboard')
+    page = client.get('/posts').get_data(as_text=True)
+    cursor = page.split('after=', 1)[1].split('"', 1)[0]
+
+    with seeded.app_context():
+        engine = db.engine
+    with QueryAudit(engine) as audit:
+        for method, url, data in ROUTES:
+            for cache in (user_cache, post_pages, feed_cache, fragment_cache, most_viewed):
+                cache.clear()
+            audit.label = '%s %s' % (method, url)
+            response = client.open(url % {'cursor': cursor}, method=method, data=data)
+            # Streamed pages only query as their body is read
+            response.get_data()
+            assert response.status_code < 400, audit.label
+    assert audit.statements
+    with seeded.app_context():
+        audit.assert_indexed(allow=ALLOW)
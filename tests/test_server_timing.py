@@ -0,0 +1,34 @@
+import pytest
+
+from extensions import db, password_hasher
+from models import Users
+
+
+@pytest.fixture
+def users(app):
+    passwd = password_hasher.hash('secret')
+    with app.app_context():
+        db.session.add(Users(username='admin', name='Admin', email='admin@example.com', passwd=passwd))
+        db.session.add(Users(username='reader', name='Reader', email='reader@example.com', passwd=passwd))
+        db.session.commit()
+    return app
+
+
+def login(app, username):
+    client = app.test_client()
+    assert client.post('/login', data={'username': username, 'passwd': 'secret'}).status_code == 302
+    return client
+
+
+def test_only_the_admin_sees_timings(users, client):
+    assert 'Server-Timing' in login(users, 'admin').get('/dashboard').headers
+    assert 'Server-Timing' not in login(users, 'reader').get('/dashboard').headers
+    assert 'Server-Timing' not in client.get('/login').headers
+
+
+@pytest.mark.parametrize('url', ['/feed.atom', '/static/css/style.css'])
+def test_public_responses_stay_cacheable(users, url):
+    response = login(users, 'admin').get(url)
+    assert response.status_code == 200
+    assert 'Server-Timing' not in response.headers
+    assert 'Cookie' not in response.vary
@@ -0,0 +1,74 @@
+"""The app's engine must connect with the pragmas config.py asks for, so
+readers carry on past a writer and a second writer waits its turn."""
+import threading
+import time
+
+import pytest
+from sqlalchemy import text
+
+from app import create_app
+from config import TestingConfig
+from extensions import db
+from models import Users
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    # WAL needs a file, an in-memory database ignores it
+    config = type('FileConfig', (TestingConfig,),
+                  {'SQLALCHEMY_DATABASE_URI': 'sqlite:///%s' % (tmp_path / 'app.db')})
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+        db.session.add(Users(username='writer', name='Writer', passwd='x'))
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+def hold_write_lock(engine):
+    """A raw connection of ``engine`` holding SQLite's write lock."""
+    connection = engine.raw_connection()
+    connection.driver_connection.isolation_level = None
+    connection.execute("BEGIN EXCLUSIVE")
+    connection.execute("UPDATE users SET name = 'Held'")
+    return connection
+
+
+def test_connections_get_the_configured_pragmas(file_app):
+    with db.engine.connect() as connection:
+        assert connection.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert connection.execute(text('PRAGMA busy_timeout')).scalar() == file_app.config['SQLITE_BUSY_TIMEOUT']
+
+
+def test_readers_carry_on_while_writing(file_app):
+    writer = hold_write_lock(db.engine)
+    try:
+        # Under a rollback journal the exclusive lock shuts readers out
+        # until the busy timeout runs out
+        with db.engine.connect() as connection:
+            assert connection.execute(text('SELECT name FROM users')).scalar() == 'Writer'
+    finally:
+        writer.execute("ROLLBACK")
+        writer.close()
+
+
+def test_second_writer_waits_for_the_lock(file_app):
+    writer = hold_write_lock(db.engine)
+
+    def commit_soon():
+        time.sleep(0.2)
+        writer.execute("COMMIT")
+
+    thread = threading.Thread(target=commit_soon)
+    thread.start()
+    try:
+        # Without busy_timeout this fails straight away with "database is locked"
+        with db.engine.begin() as connection:
+            connection.execute(text("UPDATE users SET name = 'Second'"))
+    finally:
+        thread.join()
+        writer.close()
+    with db.engine.connect() as connection:
+        assert connection.execute(text('SELECT name FROM users')).scalar() == 'Second'
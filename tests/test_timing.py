@@ -0,0 +1,24 @@
+import time
+
+from timing import SamplingProfiler
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_profiler_samples_each_armed_request():
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.arm(3)
+    for _ in range(3):
+        samples = profiler.samples
+        assert profiler.start_request()
+        busy(0.1)
+        profiler.end_request()
+        # Let the sampler go idle, so the next request has to wake it
+        time.sleep(0.01)
+        assert profiler.samples > samples
+    assert not profiler.start_request()
+    assert 'busy (test_timing.py' in profiler.folded()
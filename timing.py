@@ -0,0 +1,233 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import g, has_request_context
+from jinja2 import Template
+from sqlalchemy import event
+
+
+logger = logging.getLogger(__name__)
+
+# The phases a request is broken down into, in Server-Timing order
+PHASES = ('db', 'render', 'hash', 'upload')
+
+
+class RequestTimer:
+    """Seconds spent in each phase of one request, plus the number of queries."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spent = dict.fromkeys(PHASES, 0.0)
+        self.queries = 0
+        self.status = None
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def server_timing(self):
+        """The Server-Timing header value, durations in milliseconds."""
+        parts = []
+        for phase in PHASES:
+            if self.spent[phase]:
+                part = '%s;dur=%.2f' % (phase, self.spent[phase] * 1000)
+                if phase == 'db':
+                    part += ';desc="%d queries"' % self.queries
+                parts.append(part)
+        parts.append('total;dur=%.2f' % (self.elapsed() * 1000))
+        return ', '.join(parts)
+
+    def record(self, **fields):
+        """Everything about the request as one dict, for the log line."""
+        record = dict(fields, status=self.status, total_ms=round(self.elapsed() * 1000, 3),
+                      queries=self.queries)
+        for phase in PHASES:
+            record['%s_ms' % phase] = round(self.spent[phase] * 1000, 3)
+        return record
+
+
+def current():
+    """The running request's timer, or None outside a timed request."""
+    if has_request_context():
+        return g.get('timer')
+    return None
+
+
+@contextmanager
+def phase(name):
+    """Count the time spent in the block towards ``name`` for the current request."""
+    timer = current()
+    if timer is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.spent[name] += time.perf_counter() - start
+
+
+def instrument(engine):
+    """Time every statement ``engine`` runs for a request towards 'db'."""
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('timing_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info['timing_start'].pop()
+        timer = current()
+        if timer is not None:
+            timer.spent['db'] += time.perf_counter() - start
+            timer.queries += 1
+
+
+class TimedTemplate(Template):
+    """Counts rendering towards 'render'. Set as the environment's template_class.
+
+    Included and extended templates render inside their parent's call, so
+    nothing is counted twice. Streamed pages are timed chunk by chunk, which
+    only the log line sees: their headers leave before the body is made.
+    """
+
+    def render(self, *args, **kwargs):
+        with phase('render'):
+            return super().render(*args, **kwargs)
+
+    def generate(self, *args, **kwargs):
+        chunks = super().generate(*args, **kwargs)
+        timer = current()
+        if timer is None:
+            yield from chunks
+            return
+        # Streams yield many small pieces, so skip phase() and its lookups per piece
+        clock = time.perf_counter
+        while True:
+            start = clock()
+            chunk = next(chunks, None)
+            timer.spent['render'] += clock() - start
+            if chunk is None:
+                return
+            yield chunk
+
+
+def log_request(timer, **fields):
+    logger.info(json.dumps(timer.record(**fields), sort_keys=True))
+
+
+def enable_log():
+    """Send the per request lines to stderr, unless logging is set up for them already."""
+    if not logger.handlers:
+        logger.addHandler(logging.StreamHandler())
+        logger.setLevel(logging.INFO)
+
+
+class SamplingProfiler:
+    """Samples the stacks of the next few requests a worker serves.
+
+    arm(n) profiles the next ``n`` requests: while one runs, a background
+    thread looks at its stack every ``interval`` seconds and counts it.
+    The counts are kept as folded stacks ("outer;inner;innermost count"),
+    the input flamegraph.pl and speedscope take.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.remaining = 0
+        self.samples = 0
+        self.stacks = Counter()
+        self._threads = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def configure(self, interval):
+        self.interval = interval
+
+    def arm(self, requests):
+        """Throw away what was collected and profile the next ``requests`` requests."""
+        with self._lock:
+            self.remaining = requests
+            self.samples = 0
+            self.stacks = Counter()
+
+    def start_request(self):
+        """Profile the calling thread's request if any are left to profile. Returns whether it is."""
+        if not self.remaining:
+            return False
+        with self._lock:
+            if not self.remaining:
+                return False
+            self.remaining -= 1
+            self._threads.add(threading.get_ident())
+            # Threads don't survive a fork, so start it on first use in the worker
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return True
+
+    def end_request(self):
+        with self._lock:
+            self._threads.discard(threading.get_ident())
+
+    def _run(self):
+        while True:
+            # Check and clear together: a request starting in between would
+            # otherwise have its wake up cleared and go unsampled
+            with self._lock:
+                idle = not self._threads
+                if idle:
+                    self._wake.clear()
+            if idle:
+                self._wake.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for ident in self._threads:
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        self.stacks[fold(frame)] += 1
+                        self.samples += 1
+
+    def folded(self):
+        with self._lock:
+            return '\n'.join('%s %d' % item for item in self.stacks.most_common())
+
+    def functions(self, n=20):
+        """The ``n`` functions seen most: (function, self samples, total samples, share of all samples).
+
+        Self counts samples with the function innermost, total the samples
+        with it anywhere on the stack.
+        """
+        own = Counter()
+        total = Counter()
+        with self._lock:
+            for stack, count in self.stacks.items():
+                names = stack.split(';')
+                own[names[-1]] += count
+                for name in set(names):
+                    total[name] += count
+            samples = self.samples
+        return [(name, own[name], count, count / samples) for name, count in total.most_common(n)]
+
+    def stats(self):
+        with self._lock:
+            return {"remaining": self.remaining, "samples": self.samples,
+                    "stacks": len(self.stacks), "profiling": len(self._threads)}
+
+
+# A frame as "function (file.py:line it's defined on)", so every sample of a
+# function lands on the same node whatever line it was on
+def fold(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append('%s (%s:%d)' % (code.co_name, os.path.basename(code.co_filename), code.co_firstlineno))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
@@ -0,0 +1,846 @@
+from flask import Blueprint, current_app, render_template, flash, request, redirect, url_for, make_response, session
+from flask import abort, g
+from flask import get_flashed_messages, stream_with_context, send_from_directory
+import hashlib
+import mimetypes
+from datetime import datetime, date
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, load_only, undefer_group
+from flask_login import login_user, login_required, logout_user, current_user
+
+from webforms import LoginForm, PasswordForm, UserForm, PostForm, SearchForm, ProfileForm
+from pagination import keyset_paginate
+import search_index
+import api
+import timing
+from cache import CachedPage
+from feed import atom_feed, feed_updated
+from images import thumbnail_files, is_content_addressed
+from assets import IMMUTABLE_MAX_AGE
+from compression import compress_response
+from passwords import HasherBusy
+from extensions import db, image_pipeline, password_hasher, user_cache, post_pages, feed_cache, asset_manifest
+from extensions import fragment_cache, view_counter, most_viewed, rate_limiter, admission, profiler
+from models import Users, Posts, PostViews
+
+
+bp = Blueprint('main', __name__)
+
+
+# Drop everything cached about a user after their row changes
+def user_changed(id):
+    user_cache.invalidate('user:%d' % id)
+    post_pages.invalidate('user:%d' % id)
+    feed_cache.clear()
+    # current_user is the snapshot loaded at the start of the request, bring
+    # it up to date for the page rendered after the change
+    if current_user.is_authenticated and current_user.id == id:
+        user = db.session.get(Users, id)
+        if user is not None:
+            current_user.update(user)
+
+
+# Render a listing page as it goes instead of building it all in memory first,
+# so the navbar goes out straight away and rows follow in chunks
+def render_streamed(template_name, **context):
+    # The session cookie is sent before the body, so anything the template
+    # would take out of the session has to happen now. Flashes are cached
+    # on the request once read, which keeps the template's own call working
+    get_flashed_messages()
+
+    current_app.update_template_context(context)
+    template = current_app.jinja_env.get_or_select_template(template_name)
+    stream = template.stream(context)
+    stream.enable_buffering(current_app.config['STREAM_BUFFER_SIZE'])
+    return current_app.response_class(stream_with_context(stream), mimetype='text/html')
+
+
+# Posts together with their author, loaded in the same SELECT
+def posts_with_poster():
+    return Posts.query.options(joinedload(Posts.poster))
+
+
+# Grab one page of posts, using the cursor in the query string if there is one
+def posts_page(query=None):
+    if query is None:
+        query = posts_with_poster()
+    return keyset_paginate(query, Posts.date_posted, Posts.id,
+                           current_app.config['POSTS_PER_PAGE'],
+                           after=request.args.get('after'),
+                           before=request.args.get('before'))
+
+
+# One page of the user list, oldest first
+def users_page():
+    return keyset_paginate(Users.query, Users.date_added, Users.id,
+                           current_app.config['USERS_PER_PAGE'],
+                           after=request.args.get('after'),
+                           before=request.args.get('before'))
+
+
+# Time each request from the first hook on, see timing.py. The admin's own
+# pages are left out of profiling so looking at a profile doesn't skew it
+@bp.before_app_request
+def start_timer():
+    g.timer = timing.RequestTimer()
+    if not (request.endpoint or '').startswith('main.admin'):
+        g.profiled = profiler.start_request()
+
+
+# Whose bucket a request takes from besides its IP's: the account being
+# logged in to, or else whoever is signed in
+def rate_limit_account():
+    username = request.form.get('username')
+    if username:
+        return 'name:' + username
+    if current_user.is_authenticated:
+        return 'id:%s' % current_user.get_id()
+    return None
+
+
+# Turn away clients going over RATELIMITS before any work is done for them
+@bp.before_app_request
+def rate_limit():
+    retry_after = rate_limiter.check(request.endpoint, request.method, request.remote_addr,
+                                     rate_limit_account)
+    if retry_after is not None:
+        response = make_response(render_template('429.html', retry_after=retry_after), 429)
+        response.headers['Retry-After'] = str(retry_after)
+        return response
+
+
+# Hold expensive requests to their cost class's share of the worker, and
+# turn them away quickly when its queue is full. See admission.py
+@bp.before_app_request
+def admit():
+    cost_class = admission.class_for(request.endpoint, request.method)
+    if cost_class is None:
+        return None
+    if not cost_class.acquire():
+        response = make_response(render_template('503.html'), 503)
+        response.headers['Retry-After'] = '1'
+        return response
+    g.cost_class = cost_class
+
+
+# Streamed pages tear down once the last chunk is out, so the slot is held
+# for as long as the page is being produced
+@bp.teardown_app_request
+def release_admission(exc):
+    cost_class = g.pop('cost_class', None)
+    if cost_class is not None:
+        cost_class.release()
+
+
+# Whether this response gets the Server-Timing header, see SERVER_TIMING
+def shows_timing(response):
+    setting = current_app.config['SERVER_TIMING']
+    if setting != 'admin':
+        return setting == '1'
+    # Static files and the feed are the same for everyone and cached as such:
+    # reading the session would load the user and add Vary: Cookie to them
+    if request.endpoint == 'static' or response.cache_control.public:
+        return False
+    # Signed out visitors have nothing in the session to load
+    if session.get('_user_id') is None:
+        return False
+    return current_user.is_authenticated and current_user.id == 1
+
+
+# The breakdown so far goes out as a Server-Timing header. Registered
+# before compress so it runs after it, and the total includes compressing
+@bp.after_app_request
+def server_timing(response):
+    timer = g.get('timer')
+    if timer is not None:
+        timer.status = response.status_code
+        if shows_timing(response):
+            response.headers['Server-Timing'] = timer.server_timing()
+    return response
+
+
+# The log line waits for teardown, after a streamed body has gone out
+@bp.teardown_app_request
+def log_timing(exc):
+    if g.pop('profiled', False):
+        profiler.end_request()
+    timer = g.pop('timer', None)
+    if timer is not None and current_app.config['TIMING_LOG']:
+        timing.log_request(timer, method=request.method, path=request.path, endpoint=request.endpoint)
+
+
+# Compress HTML and JSON on the way out, see compression.py
+@bp.after_app_request
+def compress(response):
+    return compress_response(response, request.accept_encodings,
+                             mimetypes=current_app.config['COMPRESS_MIMETYPES'],
+                             min_size=current_app.config['COMPRESS_MIN_SIZE'],
+                             gzip_level=current_app.config['COMPRESS_LEVEL'],
+                             brotli_quality=current_app.config['COMPRESS_BROTLI_QUALITY'])
+
+
+# ADMIN Page
+@bp.route('/admin')
+@login_required
+def admin():
+    id = current_user.id
+
+    if id == 1:
+        # Stored counts only change when the counter flushes, so keep the
+        # list that long rather than reading post_views on every visit
+        top = most_viewed.get('top')
+        if top is None:
+            top = db.session.query(Posts.title, Posts.slug, PostViews.views) \
+                .join(PostViews, PostViews.post_id == Posts.id) \
+                .order_by(PostViews.views.desc()).limit(10).all()
+            most_viewed.set('top', top)
+        return render_template('admin.html', most_viewed=top, view_stats=view_counter.stats(),
+                               profile_form=ProfileForm(), profile=profiler.stats(),
+                               functions=profiler.functions())
+    else:
+        flash("Sorry you must be the Admin to access this page")
+        return redirect(url_for('main.dashboard'))
+
+
+# Cache counters for monitoring
+@bp.route('/admin/metrics')
+@login_required
+def admin_metrics():
+    if current_user.id != 1:
+        return {"error": "admin only"}, 403
+
+    return {
+        "user_cache": user_cache.stats(),
+        "post_pages": post_pages.stats(),
+        "feed": feed_cache.stats(),
+        "fragments": fragment_cache.stats(),
+        "views": view_counter.stats(),
+        "rate_limited": rate_limiter.limited,
+        "admission": admission.stats(),
+        "profiler": profiler.stats(),
+    }
+
+
+# Profile the next requests this worker serves, or download what was
+# sampled as folded stacks for flamegraph.pl or speedscope
+@bp.route('/admin/profile', methods=['GET', 'POST'])
+@login_required
+def admin_profile():
+    if current_user.id != 1:
+        flash("Sorry you must be the Admin to access this page")
+        return redirect(url_for('main.dashboard'))
+
+    if request.method == 'GET':
+        return current_app.response_class(profiler.folded(), mimetype='text/plain')
+
+    form = ProfileForm()
+    if form.validate_on_submit():
+        requests = min(form.requests.data, current_app.config['PROFILER_MAX_REQUESTS'])
+        profiler.arm(requests)
+        flash("Profiling the next %d requests" % requests)
+    else:
+        flash("Pick how many requests to profile")
+    return redirect(url_for('main.admin'))
+
+
+# Create a route decorator
+@bp.route('/')
+@login_required
+def index():
+    first_name = "Sem"
+    flash("Welcome to our Website!")
+    return render_template('index.html', first_name=first_name)
+
+
+# Author page: their stats straight off the users row, then their posts a
+# page at a time through ix_posts_post_id_date_posted
+@bp.route('/user/<name>')
+@login_required
+def user(name):
+    author = Users.query.filter_by(username=name).first_or_404()
+    posts = posts_page(posts_with_poster().filter(Posts.post_id == author.id))
+    return render_streamed('user.html', author=author, posts=posts)
+
+
+# The navbar's Profile link. The navbar goes into cached pages shared by
+# every viewer, so it links here rather than to anyone's own page
+@bp.route('/me')
+@login_required
+def me():
+    return redirect(url_for('main.user', name=current_user.username))
+
+
+# Returning Json Strings
+@bp.route('/date')
+def get_current_date():
+    return {"Date": date.today()}
+
+
+# Create custom Error Pages:
+
+# Invalid URL
+# Infrastructure Error
+@bp.app_errorhandler(401)
+def page_not_found(e):
+    return render_template('404.html'), 401
+
+
+@bp.app_errorhandler(404)
+def page_not_found(e):
+    return render_template('404.html'), 404
+
+# Internal Server Error
+
+
+@bp.app_errorhandler(500)
+def page_not_found(e):
+    return render_template('500.html'), 500
+
+
+# Thumbnail urls for a profile picture: (webp or None, fallback)
+@bp.app_template_global()
+def profile_pic_urls(name, width):
+    if not name:
+        return None, url_for('static', filename='images/default_profile_pic.png')
+    webp, fallback = thumbnail_files(current_app.config['UPLOAD_FOLDER'], name, width)
+    if webp:
+        webp = url_for('static', filename='images/' + webp)
+    return webp, url_for('static', filename='images/' + fallback)
+
+
+# url_for('static', filename=...) points at the hashed copy when there is one
+@bp.app_url_defaults
+def hashed_static_url(endpoint, values):
+    if endpoint == 'static' and 'filename' in values:
+        values['filename'] = asset_manifest.url_name(values['filename'])
+
+
+# Static files, with precompressed copies for clients that take them and a
+# far future expiry for names that change whenever the content does
+def static_file(filename):
+    hashed = asset_manifest.is_hashed(filename)
+    encoding = None
+    if hashed:
+        encoding, stored = asset_manifest.encoding_for(filename, request.accept_encodings)
+    if encoding:
+        response = send_from_directory(current_app.static_folder, stored,
+                                       mimetype=mimetypes.guess_type(filename)[0])
+        response.content_encoding = encoding
+    else:
+        response = current_app.send_static_file(filename)
+
+    if hashed:
+        response.vary.add('Accept-Encoding')
+    if hashed or is_content_addressed(filename):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    return response
+
+
+# Create Search Function
+@bp.route('/search', methods=["GET", "POST"])
+def search():
+    form = SearchForm()
+
+    if form.validate_on_submit():
+        # Get data from submitted form
+        searched = form.searched.data
+    else:
+        # Following a page link
+        searched = request.args.get('q', '').strip()
+
+    page = request.args.get('page', 1, type=int)
+    if page < 1:
+        page = 1
+
+    # Query the search index
+    posts, has_next = [], False
+    if searched:
+        posts, has_next = search_index.search_posts(db.session, posts_with_poster(), searched,
+                                                    page=page,
+                                                    per_page=current_app.config['SEARCH_RESULTS_PER_PAGE'])
+
+    return render_streamed("search.html", form=form, searched=searched, posts=posts,
+                           page=page, has_next=has_next)
+
+
+# Create Login Page
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    form = LoginForm()
+
+    if form.validate_on_submit():
+        user = Users.query.filter_by(username=form.username.data).first()
+        if user:
+            # Check the password hash if it matches the typed password
+            try:
+                passed = user.verify_password(form.passwd.data)
+            except HasherBusy:
+                flash("We're a bit busy right now, try logging in again in a moment")
+                return render_template('login.html', form=form), 503
+
+            if passed:
+                # Saves the new hash if verify_password upgraded it
+                db.session.commit()
+                login_user(user)
+                flash("Logged In Successfully")
+                return redirect(url_for('main.dashboard'))
+            else:
+                flash("Incorrect password! - Try Again")
+        else:
+            flash("Incorrect Username. Try Again")
+
+    return render_template('login.html', form=form)
+
+
+@bp.route('/dashboard', methods=['GET', 'POST'])
+@login_required
+def dashboard():
+    form = UserForm()
+    id = current_user.id
+    name_to_update = Users.query.get_or_404(id)
+
+    if request.method == 'POST':
+        name_to_update.name = request.form['name']
+        name_to_update.email = request.form['email']
+        name_to_update.fav_color = request.form['fav_color']
+        name_to_update.username = request.form['username']
+        name_to_update.about_author = request.form['about_author']
+       
+        # Check for profile pic
+        if request.files['profile_pic']:
+            try:
+                # Save The Image, the thumbnails get made off the request thread
+                name_to_update.profile_pic = image_pipeline.save_upload(
+                    request.files['profile_pic'],
+                    on_done=lambda: post_pages.invalidate('user:%d' % id))
+
+                db.session.commit()
+                user_changed(id)
+                flash("User Updated Successfully")
+                return render_template('dashboard.html', form=form, name_to_update=name_to_update)
+
+            except:
+                db.session.rollback()
+                flash("Error! Encountered a problem...Try Again")
+                return render_template('dashboard.html', form=form, name_to_update=name_to_update)
+        
+        else:
+            db.session.commit()
+            user_changed(id)
+            flash("User Updated Successfully")
+            return render_template('dashboard.html', form=form, name_to_update=name_to_update)
+         
+    else:
+        return render_template('dashboard.html', form=form, name_to_update=name_to_update, id=id)
+
+
+# Create Logout Function/Page
+@bp.route('/logout', methods=['GET', 'POST'])
+@login_required
+def logout():
+    logout_user()
+    flash("You Have Been Logged Out!")
+    return redirect(url_for('main.login'))
+
+
+# Users Functions
+@bp.route('/user/add', methods=['GET', 'POST'])
+def add_user():
+    name = None
+    form = UserForm()
+
+    # Validate Form
+    if form.validate_on_submit():
+        user = Users.query.filter_by(email=form.email.data).first()
+
+        if user is None:
+            # Hash the password
+            try:
+                hashed_passwd = password_hasher.hash(form.passwd.data)
+            except HasherBusy:
+                flash("We're a bit busy right now, try again in a moment")
+                our_users = users_page()
+                return render_template('add_user.html', form=form, name=name, our_users=our_users), 503
+
+            user = Users(username=form.username.data, name=form.name.data, email=form.email.data,
+                         fav_color=form.fav_color.data, passwd=hashed_passwd)
+            db.session.add(user)
+            db.session.commit()
+
+        name = form.name.data
+        form.name.data = ''
+        form.username.data = ''
+        form.email.data = ''
+        form.fav_color.data = ''
+        form.passwd.data = ''
+
+        flash("User Added Successfully!")
+
+    our_users = users_page()
+
+    return render_template('add_user.html', form=form, name=name, our_users=our_users)
+
+
+# Create Password Test Page
+@bp.route('/test_pw', methods=['GET', 'POST'])
+def test_pw():
+    email = None
+    password = None
+    pw_to_check = None
+    passed = None
+    form = PasswordForm()
+    # Validate Form
+    if form.validate_on_submit():
+        email = form.email.data
+        password = form.passwd.data
+
+        # Retrieve User by email from the Database
+        pw_to_check = Users.query.filter_by(email=email).first()
+
+        # Check Hashed Password
+        try:
+            passed = password_hasher.verify(pw_to_check.passwd, password)
+        except HasherBusy:
+            flash("We're a bit busy right now, try again in a moment")
+            return render_template('test_pw.html', email=email, password=None, pw_to_check=None, passed=None, form=form), 503
+
+        # Clear the form
+        form.email.data = ''
+        form.passwd.data = ''
+
+        flash("Form Submitted Successfully!")
+
+    return render_template('test_pw.html', email=email, password=password, pw_to_check=pw_to_check, passed=passed, form=form)
+
+
+# Update Databse Record
+@bp.route('/update/<int:id>', methods=['GET', 'POST'])
+@login_required
+def update(id):
+    form = UserForm()
+    name_to_update = Users.query.get_or_404(id)
+    if request.method == 'POST':
+        name_to_update.name = request.form['name']
+        name_to_update.email = request.form['email']
+        name_to_update.fav_color = request.form['fav_color']
+        name_to_update.username = request.form['username']
+        name_to_update.about_author = request.form['about_author']
+
+        try:
+            db.session.commit()
+            user_changed(id)
+            flash("User Updated Successfully")
+
+            return render_template('update.html', form=form, name_to_update=name_to_update, id=id)
+
+        except:
+            flash("Error! Encountered a problem...Try Again")
+
+            return render_template('update.html', form=form, name_to_update=name_to_update, id=id)
+
+    else:
+        return render_template('update.html', form=form, name_to_update=name_to_update, id=id)
+
+
+@bp.route('/delete/<int:id>')
+@login_required
+def delete(id):
+    if id == current_user.id:
+        user_to_delete = Users.query.get_or_404(id)
+        name = None
+        form = UserForm()
+
+        try:
+            # Leave their posts without an author in one UPDATE, rather than
+            # having the session load every post to do it
+            Posts.query.filter_by(post_id=id).update({Posts.post_id: None}, synchronize_session=False)
+            db.session.delete(user_to_delete)
+            db.session.commit()
+            user_changed(id)
+            flash("User Deleted Succesfully!")
+            our_users = users_page()
+            return render_template('add_user.html', form=form, name=name, our_users=our_users)
+
+        except:
+            flash("Whoops! Encountered a problem deleting the user")
+            return render_template('add_user.html', form=form, name=name, our_users=users_page())
+    else:
+        flash("Requires authorization!! You are not an Admin..")
+        return redirect(url_for('main.dashboard'))
+
+# Add Post Page
+@bp.route('/add_post', methods=['GET', 'POST'])
+@login_required
+def add_post():
+    form = PostForm()
+
+    if form.validate_on_submit():
+        poster = current_user.id
+        post = Posts(title=form.title.data,
+                     content=form.content.data,
+                     post_id=poster,
+                     slug=Posts.free_slug(form.slug.data, form.title.data))
+
+        # Clear the Form
+        form.title.data = ''
+        form.content.data = ''
+        form.slug.data = ''
+
+        # Add post to Database
+        try:
+            db.session.add(post)
+            db.session.flush()
+            search_index.index_post(db.session, post)
+            Users.count_post(poster, post.date_posted)
+            db.session.commit()
+        except IntegrityError:
+            # Someone else took the slug since free_slug looked
+            db.session.rollback()
+            flash("That slug was just taken, please try again")
+            return render_template("add_post.html", form=form)
+        feed_cache.clear()
+
+        # Return message
+        flash("Blog Post Submitted Succesfully")
+
+    # Redirect to the webpage
+    return render_template("add_post.html", form=form)
+
+
+@bp.route('/posts')
+@login_required
+def posts():
+    posts = posts_page()
+    return render_streamed('posts.html', posts=posts)
+
+
+# What the current user gets to see on a post page: edit links and admin nav
+def viewer_role(author_id):
+    role = 'author' if current_user.id == author_id else 'reader'
+    if current_user.id == 1:
+        role += '+admin'
+    return role
+
+
+# Send a cached page, or a 304 if the client already has it
+def page_response(page, mimetype='text/html'):
+    response = current_app.response_class(page.body, mimetype=mimetype)
+    response.set_etag(page.etag)
+    response.last_modified = page.last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add('Cookie')
+    return response.make_conditional(request)
+
+
+# Old links by id move to the slug url for good
+@bp.route('/posts/<int:id>')
+@login_required
+def post_by_id(id):
+    slug = db.session.query(Posts.slug).filter(Posts.id == id).scalar()
+    if slug is None:
+        abort(404)
+    return redirect(url_for('main.post', slug=slug), 301)
+
+
+@bp.route('/posts/<slug>')
+@login_required
+def post(slug):
+    # A page with a flashed message on it is a one-off, don't cache it
+    cacheable = not session.get('_flashes')
+    entry = post_pages.get(slug) if cacheable else None
+    if entry is not None:
+        page = entry['pages'].get(viewer_role(entry['author_id']))
+        if page is not None:
+            view_counter.hit(entry['id'])
+            return page_response(page)
+
+    post = posts_with_poster().options(undefer_group('body'), joinedload(Posts.view_count)) \
+        .filter(Posts.slug == slug).first_or_404()
+    id = post.id
+    view_counter.hit(id)
+    role = viewer_role(post.post_id)
+
+    body = render_template('post.html', post=post).encode()
+    page = CachedPage(body, etag=hashlib.sha1(body).hexdigest(),
+                      last_modified=post.updated_at or post.date_posted or datetime.utcnow())
+
+    if cacheable:
+        if entry is None:
+            entry = {'id': id, 'author_id': post.post_id, 'pages': {}}
+            tags = ['post:%d' % id]
+            # A deleted author leaves their posts with no post_id
+            if post.post_id is not None:
+                tags.append('user:%d' % post.post_id)
+            post_pages.set(slug, entry, tags=tags)
+        entry['pages'][role] = page
+
+    return page_response(page)
+
+
+@bp.route('/feed.atom')
+def feed():
+    page = feed_cache.get('atom')
+    if page is None:
+        # Only what the entries show: the stored excerpt stands in for the body
+        posts = Posts.query.options(
+            load_only(Posts.title, Posts.slug, Posts.date_posted, Posts.updated_at, Posts.excerpt,
+                      Posts.post_id),
+            joinedload(Posts.poster).load_only(Users.name),
+        ).order_by(Posts.date_posted.desc(), Posts.id.desc()).limit(current_app.config['FEED_SIZE']).all()
+
+        body = atom_feed("Flasker", url_for('main.feed', _external=True), url_for('main.posts', _external=True),
+                         posts, lambda post: url_for('main.post', slug=post.slug, _external=True),
+                         # Entry ids must never change, so they stay on the id urls
+                         entry_id=lambda post: url_for('main.post_by_id', id=post.id, _external=True))
+        page = CachedPage(body, etag=hashlib.sha1(body).hexdigest(),
+                          last_modified=feed_updated(posts))
+        feed_cache.set('atom', page)
+
+    response = make_response(page.body)
+    response.mimetype = 'application/atom+xml'
+    response.set_etag(page.etag)
+    response.last_modified = page.last_modified
+    # Nothing in the feed depends on who asks, so shared caches may keep it
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config['FEED_MAX_AGE']
+    return response.make_conditional(request)
+
+
+# Posts with only the columns behind the requested API fields
+def api_posts_query(fields):
+    query = Posts.query.options(load_only(*(getattr(Posts, c) for c in api.columns_for(fields))))
+    if 'author' in fields:
+        query = query.options(joinedload(Posts.poster).load_only(Users.username, Users.name))
+    return query
+
+
+# Serialize an API payload and send it with validators, or a 304
+def api_response(data, last_modified):
+    body = api.dumps(data)
+    page = CachedPage(body, etag=hashlib.sha1(body).hexdigest(), last_modified=last_modified)
+    return page_response(page, mimetype='application/json')
+
+
+@bp.route('/api/posts')
+@login_required
+def api_posts():
+    try:
+        fields = api.parse_fields(request.args.get('fields'), api.LIST_FIELDS)
+    except api.BadFields as e:
+        return {"error": str(e)}, 400
+    per_page = request.args.get('per_page', current_app.config['POSTS_PER_PAGE'], type=int)
+    per_page = max(1, min(per_page, current_app.config['API_MAX_PER_PAGE']))
+
+    posts = keyset_paginate(api_posts_query(fields), Posts.date_posted, Posts.id, per_page,
+                            after=request.args.get('after'),
+                            before=request.args.get('before'))
+
+    data = {
+        "posts": [api.post_record(post, fields) for post in posts],
+        "next": posts.next_cursor,
+        "prev": posts.prev_cursor,
+    }
+    return api_response(data, feed_updated(posts.items))
+
+
+@bp.route('/api/posts/<int:id>')
+@login_required
+def api_post(id):
+    try:
+        fields = api.parse_fields(request.args.get('fields'), api.DETAIL_FIELDS)
+    except api.BadFields as e:
+        return {"error": str(e)}, 400
+
+    post = api_posts_query(fields).filter(Posts.id == id).first()
+    if post is None:
+        return {"error": "not found"}, 404
+    return api_response(api.post_record(post, fields), post.updated_at or post.date_posted)
+
+
+@bp.route('/posts/edit/<int:id>', methods=['GET', 'POST'])
+@login_required
+def edit_post(id):
+    post = Posts.query.get_or_404(id)
+    form = PostForm()
+
+    if form.validate_on_submit():
+        post.title = form.title.data
+
+        post.slug = Posts.free_slug(form.slug.data, form.title.data, post_id=post.id)
+        post.content = form.content.data
+
+        # Update Database
+        try:
+            db.session.add(post)
+            search_index.index_post(db.session, post)
+            db.session.commit()
+        except IntegrityError:
+            # Someone else took the slug since free_slug looked
+            db.session.rollback()
+            flash("That slug was just taken, please try again")
+            return render_template('edit_post.html', form=form)
+        post_pages.invalidate('post:%d' % post.id)
+        feed_cache.clear()
+
+        flash("Post Updated Succesfully!")
+
+        return redirect(url_for('main.post', slug=post.slug))
+
+    if current_user.id == post.post_id or current_user.id == 1:
+
+        form.title.data = post.title
+        form.slug.data = post.slug
+        form.content.data = post.content
+
+        return render_template('edit_post.html', form=form)
+    else:
+        flash("You are not authorized to edit this post!!")
+        posts = posts_page()
+        return render_streamed('posts.html', posts=posts)
+
+
+@bp.route('/posts/delete/<int:id>')
+@login_required
+def delete_post(id):
+    post_to_delete = Posts.query.get_or_404(id)
+    id = current_user.id
+
+    if id == post_to_delete.post_id or id == 1:
+        try:
+            search_index.unindex_post(db.session, post_to_delete.id)
+            PostViews.query.filter_by(post_id=post_to_delete.id).delete()
+            view_counter.discard(post_to_delete.id)
+            db.session.delete(post_to_delete)
+            db.session.flush()
+            if post_to_delete.post_id is not None:
+                Users.uncount_post(post_to_delete.post_id)
+            db.session.commit()
+            post_pages.invalidate('post:%d' % post_to_delete.id)
+            feed_cache.clear()
+
+            # Return a message
+            flash("Post Deleted Succesfully!")
+
+        # Grab the first page of posts from the Database
+            posts = posts_page()
+            return render_streamed('posts.html', posts=posts)
+
+        except:
+            # Return Message on Error
+            flash("Whoops! Encountered a problem deleting the post, Try Again...")
+            # Grab all posts from the Database
+            posts = Posts.query.order_by(Posts.date_posted)
+            # Return template
+            return render_template('edit_post.html',  posts=posts)
+    else:
+        # Return a message
+        flash("You Aren't Authorized To Delete That Post!!! ")
+
+        # Grab the first page of posts from the Database
+        posts = posts_page()
+        return render_streamed('posts.html', posts=posts)
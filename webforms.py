@@ -1,6 +1,7 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField, SubmitField, PasswordField, BooleanField, ValidationError, TextAreaField
-from wtforms.validators import DataRequired, EqualTo, Length
+from wtforms import IntegerField
+from wtforms.validators import DataRequired, EqualTo, Length, NumberRange
 from wtforms.widgets import TextArea
 from flask_ckeditor import CKEditorField
 from flask_wtf.file import FileField
@@ -52,3 +53,9 @@ class LoginForm(FlaskForm):
 class SearchForm(FlaskForm):
     searched = StringField("searched", validators=[DataRequired()])
     submit = SubmitField("Search")
+
+
+# Profile the next few requests, see the admin page
+class ProfileForm(FlaskForm):
+    requests = IntegerField("Requests to profile", default=50, validators=[DataRequired(), NumberRange(min=1)])
+    submit = SubmitField("Start Profiling")